@@ -1,6 +1,7 @@
 import os
 os.environ["STREAMLIT_SERVER_ENABLE_FILE_WATCHER"] = "false"
 
+import logging
 import warnings
 # Suppress the specific, non-critical PyTorch warning
 warnings.filterwarnings("ignore", message=".*torch.classes.*", category=UserWarning)
@@ -10,21 +11,24 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from utils.optimizer import RosterOptimizer
-from utils.data_handler import DataHandler
+from utils.data_handler import DataHandler, count_assigned_staff
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import calendar
 import os
 import time
 import io
 from dotenv import load_dotenv
 import base64
-from utils.chatbot import RosteringChatbot
+from utils.chatbot import RosteringChatbot, VALID_ROLES, VALID_SKILLS
 import re
 
 # Load environment variables
 load_dotenv()
 
+# Chatbot diagnostics are logged at DEBUG; set LOG_LEVEL=DEBUG to see them
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
 # Define OPENROUTER_API_KEY after loading environment variables
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 if not OPENROUTER_API_KEY:
@@ -38,7 +42,7 @@ def strip_html_tags(text):
 def format_date(date_str):
     """Format date string to a professional format with weekday."""
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        date_obj = date.fromisoformat(date_str)
         return date_obj.strftime('%A, %B %d, %Y')  # e.g., "Monday, March 25, 2024"
     except:
         return date_str
@@ -46,7 +50,7 @@ def format_date(date_str):
 def get_short_date(date_str):
     """Format date string to a shorter format with weekday."""
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+        date_obj = date.fromisoformat(date_str)
         return date_obj.strftime('%a, %b %d')  # e.g., "Mon, Mar 25"
     except:
         return date_str
@@ -893,7 +897,7 @@ elif st.session_state.current_page == "👥 Staff Management": # Staff Managemen
         staff_to_edit = staff_df[staff_df['id'] == st.session_state.editing_staff_id].iloc[0]
         submit_label = "Update Staff"
         default_name = staff_to_edit['name']
-        default_role_index = ["Senior Doctor", "Doctor", "Senior Nurse", "Nurse", "Specialist"].index(staff_to_edit['role'])
+        default_role_index = VALID_ROLES.index(staff_to_edit['role'])
         default_skills = staff_to_edit['skills'].split(',') if staff_to_edit['skills'] else []
     else:
         submit_label = "Add Staff"
@@ -906,11 +910,9 @@ elif st.session_state.current_page == "👥 Staff Management": # Staff Managemen
         with col1:
             name = st.text_input("Name", value=default_name, key="staff_name_input")
         with col2:
-            role_options = ["Senior Doctor", "Doctor", "Senior Nurse", "Nurse", "Specialist"]
-            role = st.selectbox("Role", options=role_options, index=default_role_index, key="staff_role_selectbox")
+            role = st.selectbox("Role", options=VALID_ROLES, index=default_role_index, key="staff_role_selectbox")
         
-        skills_options = ["Emergency", "ICU", "General", "Surgery", "Pediatrics"]
-        skills = st.multiselect("Skills (Select multiple)", options=skills_options, default=default_skills, key="staff_skills_multiselect")
+        skills = st.multiselect("Skills (Select multiple)", options=VALID_SKILLS, default=default_skills, key="staff_skills_multiselect")
         
         st.markdown("<div class='form-actions'>", unsafe_allow_html=True)
         btn_col1, btn_col2 = st.columns([1, 1])
@@ -929,7 +931,6 @@ elif st.session_state.current_page == "👥 Staff Management": # Staff Managemen
                 ):
                     st.success(f"✅ Staff member {name} updated successfully!")
                     st.session_state.editing_staff_id = None
-                    st.session_state.data_handler.staff_data = st.session_state.data_handler.db.get_all_staff()
                     # Refresh chatbot's data handler reference
                     if hasattr(st.session_state, 'chatbot') and st.session_state.chatbot:
                         st.session_state.chatbot.refresh_data_handler()
@@ -939,7 +940,6 @@ elif st.session_state.current_page == "👥 Staff Management": # Staff Managemen
             else:
                 if st.session_state.data_handler.add_staff_member(name, role, skills_str):
                     st.success(f"✅ Staff member {name} added successfully!")
-                    st.session_state.data_handler.staff_data = st.session_state.data_handler.db.get_all_staff()
                     # Refresh chatbot's data handler reference
                     if hasattr(st.session_state, 'chatbot') and st.session_state.chatbot:
                         st.session_state.chatbot.refresh_data_handler()
@@ -1416,11 +1416,11 @@ elif st.session_state.current_page == "📅 Roster Generation": # Roster Generat
                     display_df = st.session_state.roster_df.copy()
                     
                     # Add formatted date and day columns
-                    display_df['Day_Name'] = pd.to_datetime(display_df['Date']).dt.strftime('%A')
+                    display_df['Day_Name'] = pd.to_datetime(display_df['Date'], format='%Y-%m-%d').dt.strftime('%A')
                     display_df['Formatted_Date'] = display_df['Date'].apply(format_date)
                     
-                    # Calculate staff count
-                    display_df['Staff_Count'] = display_df['Staff'].apply(lambda x: len(x.split(',')) if x != 'No staff assigned' else 0)
+                    # Calculate staff count: names are comma-separated, so count the commas in one pass
+                    display_df['Staff_Count'] = count_assigned_staff(display_df['Staff'])
                     
                     # Reorder columns for better presentation
                     display_df = display_df[[
@@ -1556,7 +1556,7 @@ elif st.session_state.current_page == "📅 Roster Generation": # Roster Generat
                 st.subheader("Calendar View")
                 
                 # Add week navigation
-                current_week_start = datetime.strptime(min(st.session_state.roster_df['Date']), '%Y-%m-%d')
+                current_week_start = date.fromisoformat(min(st.session_state.roster_df['Date']))
                 week_dates = [(current_week_start + timedelta(days=x)).strftime('%Y-%m-%d') 
                             for x in range(7)]
                 
@@ -1565,7 +1565,7 @@ elif st.session_state.current_page == "📅 Roster Generation": # Roster Generat
                 # Group the data by day and shift
                 calendar_data = {}
                 for _, row in st.session_state.roster_df.iterrows():
-                    date_obj = datetime.strptime(row['Date'], '%Y-%m-%d')
+                    date_obj = date.fromisoformat(row['Date'])
                     weekday = date_obj.strftime('%A')
                     day_key = f"Day {row['Day']}"
                     date_str = row['Date']
@@ -2264,8 +2264,9 @@ elif st.session_state.current_page == "💬 AI Assistant":
                 </div>
             """, unsafe_allow_html=True)
             
-            response = st.session_state.chatbot.chat(sanitized_input)
-            thinking_container.empty()  # Clear the thinking animation
+            # Stream the reply into the placeholder, replacing the thinking animation as chunks arrive
+            response = thinking_container.write_stream(st.session_state.chatbot.chat_stream(sanitized_input))
+            thinking_container.empty()  # Clear the streamed preview; the reply is rendered from chat history
             
             # Additional HTML sanitization to ensure no tags appear in UI
             response = strip_html_tags(response)
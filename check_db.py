@@ -14,37 +14,56 @@ def check_database():
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # Get list of tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
+        # Read everything from a single snapshot
+        cursor.execute("BEGIN DEFERRED")
+        
+        # Get list of tables (pragma table_list needs SQLite >= 3.37)
+        cursor.execute(
+            "SELECT name FROM pragma_table_list "
+            "WHERE schema = 'main' AND type = 'table' AND name NOT IN ('sqlite_schema', 'sqlite_temp_schema')"
+        )
+        tables = [row[0] for row in cursor.fetchall()]
+        
+        # Get every row count in one query instead of one COUNT(*) per table
+        counts = {}
+        if tables:
+            count_query = " UNION ALL ".join(
+                f"SELECT '{table}', COUNT(*) FROM \"{table}\"" for table in tables
+            )
+            counts = dict(cursor.execute(count_query).fetchall())
+        
         print("\nTables in database:")
         for table in tables:
-            print(f"- {table[0]}")
+            print(f"- {table}")
             
             # Get table schema
-            cursor.execute(f"PRAGMA table_info({table[0]})")
-            columns = cursor.fetchall()
+            columns = cursor.execute(f"PRAGMA table_info(\"{table}\")").fetchall()
             print("  Columns:")
             for col in columns:
                 print(f"    - {col[1]} ({col[2]})")
             
-            # Get row count
-            cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
-            count = cursor.fetchone()[0]
+            count = counts[table]
             print(f"  Row count: {count}")
             
             # If table has rows, show first row
             if count > 0:
-                cursor.execute(f"SELECT * FROM {table[0]} LIMIT 1")
-                row = cursor.fetchone()
+                row = cursor.execute(f"SELECT * FROM \"{table}\" LIMIT 1").fetchone()
                 print(f"  Sample row: {row}")
             print()
+        
+        conn.commit()
             
     except Exception as e:
         print(f"Error checking database: {str(e)}")
     finally:
         if 'conn' in locals():
+            # Let SQLite refresh its planner statistics before the connection goes away; a
+            # failure here must not replace an error already being reported
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                print(f"Error optimizing database: {str(e)}")
             conn.close()
 
 if __name__ == "__main__":
-    check_database() 
\ No newline at end of file
+    check_database() 
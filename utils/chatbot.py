@@ -1,27 +1,457 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
-from typing import List, Dict, Any
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Dict, Any, FrozenSet, Iterator, Callable, Optional, Tuple, Union
 import pandas as pd
-from datetime import datetime, timedelta
+import streamlit as st
+from datetime import date, datetime, timedelta
 import os
 from dotenv import load_dotenv
 import re
+from utils.keyword_scanner import KeywordScanner
+from utils.data_handler import count_assigned_staff
+from utils.rate_limiter import TokenBucket
+from utils.semantic_cache import SemanticCache
 
+logger = logging.getLogger(__name__)
+
+# Acknowledgements that never need an LLM round trip, with their canned replies
+_TRIVIAL_RESPONSE = "Okay, how can I assist you further?"
+_TRIVIAL_REPLIES = {
+    "ok": _TRIVIAL_RESPONSE,
+    "okay": _TRIVIAL_RESPONSE,
+    "yes": "Okay, what would you like to do next?",
+    "sure": "Okay, what would you like to do next?",
+    "no": "Understood. How can I assist you further?",
+    "not sure": "No problem. You can ask me about staff, leave requests or the roster.",
+    "thanks": "You're welcome! Is there anything else I can help with?",
+    "thank you": "You're welcome! Is there anything else I can help with?",
+    "hi": "Hello! How can I help you with the roster today?",
+    "hello": "Hello! How can I help you with the roster today?",
+    "hey": "Hello! How can I help you with the roster today?",
+}
+
+# Completions made at temperature 0 are cached in-process for repeat requests
+_RESPONSE_CACHE_SIZE = 512
+_RESPONSE_CACHE_TTL = 3600  # seconds
+# Staff rows change rarely; other sessions' edits to the shared database show up within this window
+_STAFF_CACHE_TTL = 30  # seconds
+# HTML-like tags stripped from replies; the bounded body keeps matching linear on stray '<'
+_MAX_TAG_LENGTH = 256
+_HTML_TAG_RE = re.compile(r'<[^<>]{0,%d}>' % _MAX_TAG_LENGTH)
+# Longest unterminated "<..." / "&..." tail held back while streaming, in case it is a split tag or entity
+_MAX_HELD_TAG = _MAX_TAG_LENGTH + 2
+_MAX_HELD_ENTITY = len("&amp;")
+
+# (connect, read) timeouts for Groq API calls
+_API_TIMEOUT = (10, 60)
+
+# Intents that change stored data; their extractions are never cached, so a request is only ever
+# executed with parameters taken from its own text
+_WRITE_INTENT_PREFIXES = ("ADD_", "DELETE_", "UPDATE_")
+
+# Fixed replies for API statuses that retrying cannot fix
+_API_STATUS_ERRORS = {
+    401: "API_AUTH_ERROR: Invalid API key. Please check your OpenRouter API key.",
+    403: "API_FORBIDDEN_ERROR: Access denied. Please check your API key permissions.",
+}
+
+# Outbound request budget: 20 requests per minute on average, bursts of up to 10
+_API_RATE_PER_SECOND = 20 / 60
+_API_BURST = 10
+
+# Conversation history is cut back only once it passes the threshold, keeping the opening
+# exchange and the latest turns, so the message prefix stays stable (and cacheable) in between
+_HISTORY_RESET_AT = 10
+_HISTORY_KEEP_HEAD = 2
+_HISTORY_KEEP_TAIL = 6
+# Rough token budget for the history (~4 characters per token); older turns past it are summarised
+_HISTORY_TOKEN_BUDGET = 2000
+
+# Solved rosters kept for identical GENERATE_ROSTER requests
+_ROSTER_CACHE_SIZE = 32
+
+# Fixed labels of generated roster rows, stored as categoricals: one small code per row instead of a string
+_WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+# Shift number n is _SHIFT_TIMES[n - 1]
+_SHIFT_TIMES = ("07:00-15:00", "15:00-23:00", "23:00-07:00")
+
+# GENERATE_ROSTER parameters and the defaults used when the user leaves them out
+_ROSTER_PARAM_DEFAULTS = {
+    "num_days": 7,
+    "shifts_per_day": 3,
+    "min_staff_per_shift": 2,
+    "max_shifts_per_week": 5,
+}
+
+# Allowed values for constrained intent parameters
+VALID_ROLES = ("Senior Doctor", "Doctor", "Senior Nurse", "Nurse", "Specialist")
+VALID_SKILLS = ("Emergency", "ICU", "General", "Surgery", "Pediatrics")
+VALID_LEAVE_TYPES = ("Annual Leave", "Sick Leave", "Personal Leave", "Emergency Leave", "Study Leave")
+VALID_STATUSES = ("Approved", "Pending", "Rejected")
+VALID_PERIODS = ("Past", "Current", "Future", "ALL")
+
+_VALID_SKILLS_SET = frozenset(VALID_SKILLS)
+_VALID_SKILLS_MSG = f"Valid skills are: {', '.join(VALID_SKILLS)}"
+
+
+def _choice_spec(label: str, plural: str, choices: tuple) -> tuple:
+    """Bundle a parameter label with an O(1) membership set and its ready-made hint."""
+    return label, frozenset(choices), f"Valid {plural} are: {', '.join(choices)}"
+
+
+# Per-intent constrained parameters: name -> (label, allowed values, hint listing them)
+_INTENT_PARAM_CHOICES = {
+    "ADD_STAFF": {"role": _choice_spec("role", "roles", VALID_ROLES)},
+    "ADD_LEAVE": {"leave_type": _choice_spec("leave type", "types", VALID_LEAVE_TYPES)},
+    "VIEW_LEAVE": {
+        "status": _choice_spec("status", "statuses", VALID_STATUSES + ("ALL",)),
+        "period": _choice_spec("period", "periods", VALID_PERIODS),
+    },
+    "UPDATE_LEAVE": {"status": _choice_spec("status", "statuses", VALID_STATUSES)},
+}
+
+# ADD_LEAVE required parameters and how to name them when they are missing
+_ADD_LEAVE_REQUIRED_FIELDS = (
+    ("staff_member", "staff member name"),
+    ("leave_type", "leave type"),
+    ("start_date", "start date"),
+    ("end_date", "end date"),
+)
+
+# Keyword-rule vocabularies of _answer_structured; a rule fires when any of its keywords occurs in the input
+_RULE_KEYWORDS = KeywordScanner({
+    "generate": ("generate",),
+    "generate_target": ("roster", "schedule", "shifts"),
+    "staff": ("staff", "staffs", "team", "member", "members", "doctor", "doctors", "nurse", "nurses"),
+    "view": ("show", "view", "list", "see", "display", "current", "all", "who are", "what are"),
+    "staff_action": ("add", "new", "create", "delete", "remove", "roster", "schedule", "shift"),
+    "table": ("table",),
+    "roster_view": ("show roster", "view roster", "current roster", "display roster"),
+    "leave_view": (
+        "show leave", "view leave", "see leave", "list leave", "show vacation", "view vacation",
+        "see vacation", "list vacation", "show absence", "view absence", "see absence", "list absence",
+    ),
+    "role": ("role", "position", "doctor", "nurse", "specialist"),
+    "action": ("add", "new", "create", "delete", "remove", "roster", "schedule", "shift", "leave", "generate"),
+})
+# Keyword vocabularies of _manual_intent_extraction
+_INTENT_KEYWORDS = KeywordScanner({
+    "generate": ("generate",),
+    "generate_target": ("roster", "schedule", "shift"),
+    "view_roster": ("show", "view", "display", "see", "what's", "what is"),
+    "roster": ("roster",),
+    "add_staff": ("add", "create", "new"),
+    "staff": ("staff", "doctor", "nurse", "member"),
+    "delete_staff": ("delete", "remove", "fire", "terminate"),
+    "staff_or_employee": ("staff", "doctor", "nurse", "member", "employee"),
+    "leave": ("leave", "vacation", "absence"),
+    "add_leave": ("add", "request", "need"),
+    "view_leave": ("show", "view", "see", "list"),
+    "delete_leave": ("delete", "remove", "cancel"),
+    "leave_or_request": ("leave", "vacation", "absence", "request"),
+})
+# Topic vocabularies of _retrieve_relevant_context
+_CONTEXT_KEYWORDS = KeywordScanner({
+    "staff": ("staff", "doctor", "nurse", "specialist", "employee", "team"),
+    "roster": ("roster", "shift", "schedule"),
+    "leave": ("leave", "vacation", "absence", "holiday"),
+})
+
+# Role and skill names as mentioned in free text, each its own category
+_STAFF_VOCABULARY = KeywordScanner({name: (name.lower(),) for name in VALID_ROLES + VALID_SKILLS})
+
+# Patterns matched against every user turn, compiled once at import
+# Staff profile queries, e.g. 'who is moktik', 'tell me about michael davis'; the name starts
+# at its first letter so the separating whitespace and the name cannot trade characters
+_PROFILE_RE = re.compile(
+    r"(?:who is|show details for|details of|show profile of|profile of|tell me about)"
+    r"\s+(?P<name>[a-zA-Z.][a-zA-Z\s.]*)"
+)
+_DAYS_RE = re.compile(r"(\d+)\s*day")
+_ROSTER_TARGET_RE = re.compile(r"(of|for|on)\s+([a-zA-Z0-9\s]+)")
+_ROSTER_FOR_RE = re.compile(r"roster for ([a-zA-Z\s]+)")
+# Roster viewing patterns (these should only show in chat, never rerun/tab change)
+_ROSTER_VIEW_PATTERNS = tuple(re.compile(p) for p in (
+    r"\b(show|view|display|see|what(?:'s| is)) (?:me )?(?:the )?(?:current )?roster( data)?\b",
+    r"\bview (?:the )?roster( data)?\b",
+    r"\bshow (?:the )?roster( data)?\b",
+    r"\bwhat(?:'s| is) (?:the )?roster( data)?\b",
+    r"\broster( data)?\b"
+))
+_ROSTER_QUERY_RE = re.compile(r"(shift timings? of|who is working on|which (doctor|nurse|staff|employee|specialist) is available on|show me [a-zA-Z\s]+'s shifts)")
+_SHIFT_TIMINGS_RE = re.compile(r"shift timings? of ([a-zA-Z\s]+)")
+_AVAILABLE_ON_DAY_RE = re.compile(r"which (doctor|nurse|staff|employee|specialist) is available on ([a-zA-Z]+)")
+_WHO_ON_DATE_RE = re.compile(r"who is working on (\d{4}-\d{2}-\d{2})")
+_STAFF_SHIFTS_RE = re.compile(r"show me ([a-zA-Z\s]+)'s shifts")
+# ADD_STAFF name and skills extraction
+_ADD_STAFF_NAME_RE = re.compile(r'(?:add|create)\s+([A-Za-z\s]+?)(?:\s+as|\s+with|\s+skills|$)', re.IGNORECASE)
+_ADD_STAFF_TITLED_NAME_RE = re.compile(r'(?:add|create)\s+([A-Za-z\s\.]+?)(?:\s+as|\s+with|\s+skills|$)', re.IGNORECASE)
+_SKILLS_LIST_RE = re.compile(r'skills?\s+(?:are|in)\s+([A-Za-z\s,]+)', re.IGNORECASE)
+_WITH_LIST_RE = re.compile(r'with\s+([A-Za-z\s,]+)', re.IGNORECASE)
+# DELETE_STAFF name: the words after the verb, up to the first filler word or the end. Words and
+# the whitespace between them use disjoint classes, so a failed match cannot backtrack quadratically
+_DELETE_STAFF_NAME_RE = re.compile(
+    r'\b(?:delete|remove|fire|terminate)\s+([A-Za-z.]+(?:\s+[A-Za-z.]+)*?)'
+    r'(?=\s+(?:from|the|staff|member|as|with|skills|who|that|has)\b|\s*$)',
+    re.IGNORECASE,
+)
+_NAME_FILLER_RE = re.compile(r'\b(?:from|the|staff|member|employee|who|that|has|as|with|skills)\b', re.IGNORECASE)
+_DELETE_STAFF_VERBS = frozenset({"delete", "remove", "fire", "terminate"})
+# Title in front of a lower-cased staff name, dropped before names are compared
+_TITLE_PREFIX_RE = re.compile(r'^(dr\.|mr\.|mrs\.|ms\.|prof\.)\s+')
+# ADD_LEAVE phrasings as one alternation, so a single scan finds the phrasing; each is wrapped in a
+# named group that m.lastgroup reports, and at the same position earlier phrasings win
+_ADD_LEAVE_RE = re.compile("|".join((
+    # e.g. add leave for moktik for 2 days annual leave
+    r"(?P<days_type>add leave for (?P<dt_name>[a-zA-Z]+) for (?P<dt_days>\d+) days? (?P<dt_type>[a-zA-Z ]+)?)",
+    # e.g. moktik needs 2 days annual leave from tomorrow
+    r"(?P<needs>(?P<n_name>[a-zA-Z]+) needs (?P<n_days>\d+) days? (?P<n_type>[a-zA-Z ]+)? from (?P<n_from>[a-zA-Z0-9\-]+))",
+    # e.g. add leave for moktik from 2024-06-01 to 2024-06-02
+    r"(?P<dates>add leave for (?P<d_name>[a-zA-Z]+) from (?P<d_start>\d{4}-\d{2}-\d{2}) to (?P<d_end>\d{4}-\d{2}-\d{2}) ?(?P<d_type>[a-zA-Z ]+)?)",
+    # e.g. add annual leave for moktik from 2024-06-01 to 2024-06-02
+    r"(?P<type_dates>add (?P<td_type>[a-zA-Z ]+) for (?P<td_name>[a-zA-Z]+) from (?P<td_start>\d{4}-\d{2}-\d{2}) to (?P<td_end>\d{4}-\d{2}-\d{2}))",
+    # e.g. add leave for moktik for 2 days
+    r"(?P<days>add leave for (?P<d_only_name>[a-zA-Z]+) for (?P<d_only_days>\d+) days?)",
+)))
+# DELETE_LEAVE request id, staff name and date
+_REQUEST_ID_RE = re.compile(r'request\s*(\d+)')
+_LEAVE_FOR_NAME_RE = re.compile(r'(?:for|of)\s+([A-Za-z]+)')
+_LEAVE_ON_DATE_RE = re.compile(r'on\s+(\d{4}-\d{2}-\d{2})')
+
+# One VIEW_LEAVE entry; reason_line is empty when the request has no reason
+_LEAVE_ENTRY_TEMPLATE = (
+    "• {staff_name} - {leave_type}\n"
+    "  {start_date} to {end_date} ({duration} days)\n"
+    "  Status: {status}\n"
+    "{reason_line}\n"
+)
+# One leave summary entry and one leave line of LLM context, filled straight from a leave row
+_RECENT_LEAVE_ENTRY_TEMPLATE = (
+    "• **{staff_member}** - {leave_type}\n"
+    "  {start_date} to {end_date} ({duration} days)\n"
+    "  Status: {status}\n\n"
+)
+_LEAVE_CONTEXT_LINE_TEMPLATE = "- {staff_member} | {leave_type} | {start_date} to {end_date} | Status: Approved\n"
+# One staff list entry, filled from a staff row
+_STAFF_ENTRY_TEMPLATE = "• **{name}** - {role}\n  Skills: {skills}\n\n"
+# One CHECK_LEAVE entry; same layout without the status line
+_UPCOMING_LEAVE_ENTRY_TEMPLATE = (
+    "• {staff_name} - {leave_type}\n"
+    "  {start_date} to {end_date} ({duration} days)\n"
+    "{reason_line}\n"
+)
+
+
+# Low-confidence intents worth a targeted follow-up: (what the user seems to want, (parameter, what to ask for))
+_CLARIFICATION_PROMPTS = {
+    "ADD_STAFF": ("add a new staff member", (
+        ("name", "staff member's name"),
+        ("role", "their role"),
+        ("skills", "their skills"),
+    )),
+    "ADD_LEAVE": ("add a leave request", (
+        ("staff_member", "who is requesting leave"),
+        ("leave_type", "what type of leave"),
+        ("start_date", "when the leave starts"),
+        ("end_date", "when the leave ends"),
+    )),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class _ParsedInput:
+    """One user message, lower-cased and split once per turn and shared by every matcher."""
+    raw: str
+    lower: str
+    tokens: Tuple[str, ...]
+    token_set: FrozenSet[str]
+
+    @classmethod
+    def parse(cls, text: str) -> "_ParsedInput":
+        lower = text.lower()
+        tokens = tuple(lower.split())
+        return cls(text, lower, tokens, frozenset(tokens))
+
+
+def _content_chars(messages: List[Dict[str, str]]) -> int:
+    """Count the content characters of chat messages; tokens are estimated at ~4 characters each."""
+    return sum(len(m["content"]) for m in messages)
+
+
+def _is_turn_start(history: List[Dict[str, str]], index: int) -> bool:
+    """Whether a cut at index keeps whole turns, i.e. does not separate a user message from its reply."""
+    if index <= 0 or index >= len(history):
+        return True
+    return not (history[index]["role"] == "assistant" and history[index - 1]["role"] == "user")
+
+
+# Decoders are stateless, so one instance serves every parse
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _json_object_complete(text: str) -> bool:
+    """Return True once text contains a complete top-level JSON object."""
+    start = text.find("{")
+    # No closing brace yet means no complete object, without attempting a parse
+    if start == -1 or text.rfind("}") < start:
+        return False
+    try:
+        _JSON_DECODER.raw_decode(text, start)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+def _iso_date(text: str) -> Optional[date]:
+    """Parse a strict YYYY-MM-DD date; other ISO shapes such as 20240315 or 2024-W10-1 give None."""
+    try:
+        parsed = date.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.isoformat() == text else None
+
+
+def _leave_days(staff_member: str, leave_type: Optional[str], start: Optional[date], duration: int) -> Dict[str, Any]:
+    """ADD_LEAVE parameters for duration days of leave starting on start; dates are left out when start is None."""
+    params = {
+        'staff_member': staff_member.capitalize(),
+        'duration': duration,
+        'leave_type': leave_type.strip().title() if leave_type else 'Annual Leave',
+    }
+    if start is not None:
+        params['start_date'] = start.strftime('%Y-%m-%d')
+        params['end_date'] = (start + timedelta(days=duration-1)).strftime('%Y-%m-%d')
+    return params
+
+
+def _leave_dates(staff_member: str, leave_type: Optional[str], start_date: str, end_date: str) -> Dict[str, Any]:
+    """ADD_LEAVE parameters for leave between two YYYY-MM-DD dates, both included."""
+    try:
+        duration = (datetime.fromisoformat(end_date) - datetime.fromisoformat(start_date)).days + 1
+    except Exception:
+        duration = 1
+    return {
+        'staff_member': staff_member.capitalize(),
+        'start_date': start_date,
+        'end_date': end_date,
+        'leave_type': leave_type.strip().title() if leave_type else 'Annual Leave',
+        'duration': duration,
+    }
+
+
+def _leave_from(from_date: str, today: date) -> Optional[date]:
+    """Start date of a 'from ...' phrase: 'tomorrow', 'today' or YYYY-MM-DD, else None."""
+    if from_date == 'tomorrow':
+        return today + timedelta(days=1)
+    if from_date == 'today':
+        return today
+    return _iso_date(from_date)
+
+
+# _ADD_LEAVE_RE phrasing (m.lastgroup) -> (match, today) -> ADD_LEAVE parameters
+_ADD_LEAVE_PARAM_BUILDERS: Dict[str, Callable[[re.Match, date], Dict[str, Any]]] = {
+    # add leave for moktik for 2 days annual leave
+    "days_type": lambda m, today: _leave_days(m['dt_name'], m['dt_type'], today, int(m['dt_days'])),
+    # moktik needs 2 days annual leave from tomorrow
+    "needs": lambda m, today: _leave_days(m['n_name'], m['n_type'], _leave_from(m['n_from'], today), int(m['n_days'])),
+    # add leave for moktik from 2024-06-01 to 2024-06-02
+    "dates": lambda m, today: _leave_dates(m['d_name'], m['d_type'], m['d_start'], m['d_end']),
+    # add annual leave for moktik from 2024-06-01 to 2024-06-02
+    "type_dates": lambda m, today: _leave_dates(m['td_name'], m['td_type'], m['td_start'], m['td_end']),
+    # add leave for moktik for 2 days
+    "days": lambda m, today: _leave_days(m['d_only_name'], None, today, int(m['d_only_days'])),
+}
 
-# Load environment variables
-load_dotenv()
 
 class RosteringChatbot:
     def __init__(self, api_key: str = None, data_handler=None, optimizer=None):
+        if not api_key:
+            # Only read .env when the caller did not hand over a key
+            load_dotenv()
         self.api_key = api_key or os.getenv('GROQ_API_KEY')
-        print(f"Debug - API Key found: {'Yes' if self.api_key else 'No'}")
-        print(f"Debug - API Key length: {len(self.api_key) if self.api_key else 0}")
+        logger.debug("API key found: %s", "Yes" if self.api_key else "No")
+        logger.debug("API key length: %d", len(self.api_key) if self.api_key else 0)
         if not self.api_key:
             raise ValueError("Groq API key not found. Please set GROQ_API_KEY in .env file")
         self.data_handler = data_handler
         self.optimizer = optimizer
         self.conversation_history = []
+        # Content characters in conversation_history, kept up to date by _append_history
+        self._history_chars = 0
         self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        # Reuse one keep-alive HTTPS connection across turns instead of a fresh TLS handshake per call
+        self._session = requests.Session()
+        # Small connection pool; transient gateway errors are retried at the transport level
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], allowed_methods=frozenset({"POST"})),
+        )
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+        # Spread bursts of API calls out locally instead of running into 429s
+        self._rate_limiter = TokenBucket(rate=_API_RATE_PER_SECOND, capacity=_API_BURST)
+        # The system prompts never change, so build their message dicts once
+        self._system_message = {"role": "system", "content": self._get_system_prompt()}
+        self._intent_system_message = {"role": "system", "content": self._get_intent_extraction_prompt()}
+        # sha256(request payload) -> (stored_at, content), oldest first
+        self._response_cache = OrderedDict()
+        self.cache_stats = {"hits": 0, "misses": 0}
+        # (staff frame from _get_staff_df, rendered staff lines) for the prompt contexts
+        self._staff_context_cache = (None, None)
+        # (fetched_at, staff_version, staff DataFrame with name_lower/name_normalized/name_canonical) for keyword rules
+        self._staff_df_cache = (0.0, None, None)
+        # (staff frame, compiled whole-word alternation of its lower-cased names)
+        self._staff_names_regex = (None, None)
+        # (staff frame, name_canonical -> row positions holding that name)
+        self._staff_name_index = (None, {})
+        # (staff frame the answers were built from, lower-cased input -> keyword-rule answer)
+        self._staff_answers = (None, {})
+        # sha256(solver inputs) -> solved roster DataFrame, oldest first
+        self._roster_cache = OrderedDict()
+        # "Today" as of the current turn, read once per message and shared by every branch
+        self._today = date.today()
+        # Read-only query results shared by every branch of the current turn
+        self._turn_reads = {}
+        # Intent extractions reused for paraphrased requests made in the same context
+        self._semantic_cache = SemanticCache()
+        # Intent name -> handler taking the extracted parameters
+        self._intent_handlers = {
+            "ADD_STAFF": self._execute_add_staff,
+            "DELETE_STAFF": self._execute_delete_staff,
+            "ADD_LEAVE": self._execute_add_leave,
+            "DELETE_LEAVE": self._execute_delete_leave,
+            "VIEW_LEAVE": self._execute_view_leave,
+            "UPDATE_LEAVE": self._execute_update_leave,
+            # Generation always navigates to the roster tab
+            "GENERATE_ROSTER": self._execute_generate_roster,
+            # Show roster in chat
+            "VIEW_ROSTER": lambda params: self._get_roster_response(),
+            "CHECK_LEAVE": self._execute_check_leave,
+            "QUERY_ROSTER": self._execute_query_roster,
+        }
+        # Ordered intent detectors of _manual_intent_extraction: (keyword categories the input must
+        # contain, detector). Detectors whose categories are missing are skipped without running
+        # their patterns; the first result wins, so the order is the precedence between intents
+        self._intent_detectors = (
+            (frozenset(), self._detect_roster_intent),
+            (frozenset({"add_staff", "staff"}), self._detect_add_staff),
+            (frozenset({"delete_staff", "staff_or_employee"}), self._detect_delete_staff),
+            (frozenset({"add_leave"}), self._detect_add_leave),
+            (frozenset({"view_leave", "leave"}), self._detect_view_leave),
+            (frozenset({"delete_leave", "leave_or_request"}), self._detect_delete_leave),
+        )
         
     
     def chat(self, user_input: str) -> str:
@@ -32,157 +462,254 @@ class RosteringChatbot:
         Returns:
             str: The chatbot's response
         """
+        return self._clean_response("".join(self.chat_stream(user_input)))
+
+    def chat_stream(self, user_input: str) -> Iterator[str]:
+        """
+        Process user input and yield the response as it is produced.
+        Most structured answers arrive as a single chunk, leave listings entry
+        by entry; general conversation is streamed token by token from the model.
+        Args:
+            user_input: The user's input text
+        Yields:
+            str: Pieces of the chatbot's response
+        """
+        self._today = date.today()
+        self._turn_reads = {}
+        # Lower-cased and split once per turn and handed to every matcher below
+        parsed = _ParsedInput.parse(user_input)
         try:
-            # Check for common general queries first
-            user_input_lower = user_input.lower()
-            
-            # Check for roster generation intent first
-            if "generate" in user_input_lower and any(phrase in user_input_lower for phrase in ["roster", "schedule", "shifts"]):
-                # For generation, we can be more direct
-                intent_data = {"intent": "GENERATE_ROSTER", "parameters": {}} # Simplified for generation
-                return self._execute_generate_roster(intent_data["parameters"])
-            
-            # Handle staff list queries
-            staff_query_words = ['staff', 'staffs', 'team', 'member', 'members', 'doctor', 'doctors', 'nurse', 'nurses']
-            view_query_words = ['show', 'view', 'list', 'see', 'display', 'current', 'all', 'who are', 'what are']
-            action_query_words = ['add', 'new', 'create', 'delete', 'remove', 'roster', 'schedule', 'shift']
-            table_requested = 'table' in user_input_lower
-
-            if any(word in user_input_lower for word in staff_query_words) and \
-               any(word in user_input_lower for word in view_query_words) and \
-               not any(word in user_input_lower for word in action_query_words):
-                return self._get_staff_list_response(table=table_requested)
-
-            # Handle roster view queries
-            if any(phrase in user_input_lower for phrase in ["show roster", "view roster", "current roster", "display roster"]) and "generate" not in user_input_lower:
-                return self._get_roster_response()
-            
-            # Handle leave view queries only (not add/delete)
-            leave_view_phrases = ["show leave", "view leave", "see leave", "list leave", "show vacation", "view vacation", "see vacation", "list vacation", "show absence", "view absence", "see absence", "list absence"]
-            if any(phrase in user_input_lower for phrase in leave_view_phrases):
-                return self._get_leave_response()
-            
-            # Handle staff profile queries (e.g., 'who is moktik', 'details of moktik', 'tell me about michael davis')
-            profile_patterns = [
-                r"who is ([a-zA-Z\s\.]+)",
-                r"details of ([a-zA-Z\s\.]+)",
-                r"show details for ([a-zA-Z\s\.]+)",
-                r"show profile of ([a-zA-Z\s\.]+)",
-                r"profile of ([a-zA-Z\s\.]+)",
-                r"tell me about ([a-zA-Z\s\.]+)"
-            ]
-            for pattern in profile_patterns:
-                match = re.search(pattern, user_input_lower)
-                if match:
-                    staff_name = match.group(1).strip()
-                    # Always fetch fresh staff data from the database
-                    staff_df = self.data_handler.db.get_all_staff()
-                    # Normalize names for comparison
-                    staff_df['name_normalized'] = staff_df['name'].astype(str).str.lower().str.strip()
-                    staff_name_normalized = staff_name.lower().strip()
-                    found = staff_df[staff_df['name_normalized'].str.contains(staff_name_normalized)]
-                    if not found.empty:
-                        staff = found.iloc[0]
-                        response = f"Here are the details for {staff['name']} (from the staff database):\n\n"
-                        response += f"• **Role:** {staff['role']}\n"
-                        response += f"• **Skills:** {staff['skills']}\n"
-                        response += "If you want to know about their roster or leave, just ask!"
-                        return response
-                    else:
-                        return f"I'm sorry, but I couldn't find a staff member named '{staff_name}'. Please check the name and try again. You can view the staff list by asking 'show staff list'."
-            
-            # Handle queries about a staff member's role (e.g., 'is lisa chen a doctor or nurse')
-            role_keywords = ['role', 'position', 'doctor', 'nurse', 'specialist']
-            action_keywords = ['add', 'new', 'create', 'delete', 'remove', 'roster', 'schedule', 'shift', 'leave', 'generate']
-            
-            is_role_query = any(word in user_input_lower for word in role_keywords)
-            is_action_query = any(word in user_input_lower for word in action_keywords)
+            response = self._answer_structured(parsed)
+            if isinstance(response, str):
+                yield response
+                return
+            if response is not None:
+                yield from response
+                return
+            yield from self._converse(parsed)
+        except Exception as e:
+            error_msg = f"I apologize, but I encountered an error while processing your request: {e}. Please try again with your request."
+            self._append_history({"role": "assistant", "content": error_msg})
+            yield self._clean_response(error_msg)
 
-            if is_role_query and not is_action_query:
-                staff_df = self.data_handler.db.get_all_staff()
-                staff_df['name_lower'] = staff_df['name'].str.lower()
-                
-                found_staff = None
-                
-                for _, staff_row in staff_df.iterrows():
-                    if re.search(r'\b' + re.escape(staff_row['name_lower']) + r'\b', user_input_lower):
-                        found_staff = staff_row
-                        break
-                
-                if found_staff is not None:
-                    staff_name = found_staff['name']
-                    staff_role = found_staff['role']
-                    return f"{staff_name}'s role is {staff_role}."
+    def _answer_structured(self, parsed: _ParsedInput):
+        """Answer queries handled by keyword rules or intents; return None for general conversation."""
+        # Answer bare acknowledgements directly instead of calling the API
+        normalized = parsed.lower.strip().rstrip("!.?")
+        if normalized in _TRIVIAL_REPLIES or len(normalized) < 3:
+            canned = _TRIVIAL_REPLIES.get(normalized, _TRIVIAL_RESPONSE)
+            self._append_history(
+                {"role": "user", "content": parsed.raw},
+                {"role": "assistant", "content": canned},
+            )
+            return canned
 
-            # Extract intent and parameters using NLP
-            intent_data = self._extract_intent_and_parameters(user_input)
-            
-            # Execute action if intent is detected
-            if intent_data["intent"] != "NONE":
-                result = self._execute_intent(intent_data)
-                return self._clean_response(result)
-            
-            # If no specific intent, use general conversation
-            context = self._retrieve_relevant_context(user_input)
-            
-            # Prepare messages for the API call
-            messages = [
-                {"role": "system", "content": self._get_system_prompt()},
-                {"role": "system", "content": f"Relevant context for this query:\n{context}"},
-                *self.conversation_history,
-                {"role": "user", "content": user_input}
-            ]
-            
-            # Get AI response
-            response = self._call_groq(messages)
-            
-            # Clean up HTML-like elements from response (centralized cleanup)
-            response = re.sub(r'<[^>]+>', '', response)  # Remove all HTML tags
-            response = response.strip()
-            
-            # Add to conversation history
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": response})
+        # A command typed directly as an intent JSON object is executed without an LLM round trip
+        direct_intent = self._parse_direct_intent(parsed.raw)
+        if direct_intent is not None:
+            return self._clean_result(self._execute_intent(direct_intent))
+
+        # Check for common general queries first
+        # Staff list, profile and role answers only change with the staff rows
+        cached = self._cached_staff_answer(parsed.lower)
+        if cached is not None:
+            return cached
+        keywords = _RULE_KEYWORDS.scan(parsed.lower)
+        
+        # Check for roster generation intent first
+        if "generate" in keywords and "generate_target" in keywords:
+            # For generation, we can be more direct
+            intent_data = {"intent": "GENERATE_ROSTER", "parameters": {}} # Simplified for generation
+            return self._execute_generate_roster(intent_data["parameters"])
+        
+        # Handle staff list queries
+        if "staff" in keywords and "view" in keywords and "staff_action" not in keywords:
+            return self._remember_staff_answer(
+                parsed.lower, self._get_staff_list_response(table="table" in keywords)
+            )
+
+        # Handle roster view queries
+        if "roster_view" in keywords and "generate" not in keywords:
+            return self._get_roster_response()
+        
+        # Handle leave view queries only (not add/delete)
+        if "leave_view" in keywords:
+            return self._get_leave_response()
+        
+        # Handle staff profile queries (e.g., 'who is moktik', 'details of moktik', 'tell me about michael davis')
+        match = _PROFILE_RE.search(parsed.lower)
+        if match:
+            staff_name = match.group("name").strip()
+            # Names come pre-normalized for comparison
+            staff_df = self._get_staff_df()
+            staff_name_normalized = staff_name.lower().strip()
+            found = staff_df[staff_df['name_normalized'].str.contains(staff_name_normalized, regex=False)]
+            if not found.empty:
+                staff = found.iloc[0]
+                response = f"Here are the details for {staff['name']} (from the staff database):\n\n"
+                response += f"• **Role:** {staff['role']}\n"
+                response += f"• **Skills:** {staff['skills']}\n"
+                response += "If you want to know about their roster or leave, just ask!"
+                return self._remember_staff_answer(parsed.lower, response)
+            else:
+                return self._remember_staff_answer(
+                    parsed.lower,
+                    f"I'm sorry, but I couldn't find a staff member named '{staff_name}'. Please check the name and try again. You can view the staff list by asking 'show staff list'."
+                )
+        
+        # Handle queries about a staff member's role (e.g., 'is lisa chen a doctor or nurse')
+        if "role" in keywords and "action" not in keywords:
+            staff_df = self._get_staff_df()
             
-            # Keep conversation history manageable
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
+            found_staff = None
             
-            # Always clean the response before returning
-            return self._clean_response(response)
+            # One pass over the input for all staff names at once
+            match = self._get_staff_names_regex(staff_df).search(parsed.lower)
+            if match:
+                found_staff = staff_df[staff_df['name_lower'] == match.group(1)].iloc[0]
             
-        except Exception as e:
-            error_msg = f"I apologize, but I encountered an error while processing your request: {str(e)}. Please try again with your request."
-            self.conversation_history.append({"role": "assistant", "content": error_msg})
-            return self._clean_response(error_msg)
+            if found_staff is not None:
+                staff_name = found_staff['name']
+                staff_role = found_staff['role']
+                return self._remember_staff_answer(parsed.lower, f"{staff_name}'s role is {staff_role}.")
+
+        # Extract intent and parameters using NLP
+        intent_data = self._extract_intent_and_parameters(parsed)
+        
+        # Execute action if intent is detected
+        if intent_data["intent"] != "NONE":
+            result = self._execute_intent(intent_data)
+            # The intent may have changed the data the turn's reads were taken from
+            self._turn_reads.clear()
+            return self._clean_result(result)
 
-        return self._simple_keyword_fallback(user_input)
+        return None
 
-    def _simple_keyword_fallback(self, user_input):
-        """Simple keyword-based fallback for when semantic search fails"""
-        user_input_lower = user_input.lower()
-        # Always fetch fresh staff data from the database
-        staff_df = self.data_handler.db.get_all_staff()
+    def _converse(self, parsed: _ParsedInput) -> Iterator[str]:
+        """Stream a free-form LLM answer and record the turn in the conversation history."""
+        context = self._retrieve_relevant_context(parsed)
+        
+        # Prepare messages for the API call. The per-query context goes after the history so
+        # the system prompt and earlier turns form an identical prefix from one call to the next
+        messages = [
+            self._system_message,
+            *self.conversation_history,
+            {"role": "system", "content": f"Relevant context for this query:\n{context}"},
+            {"role": "user", "content": parsed.raw}
+        ]
+        
+        # Forward AI response chunks as they arrive, cleaned of HTML-like elements on the way
+        chunks = []
+        for chunk in self._clean_chunks(self._stream_groq(messages)):
+            chunks.append(chunk)
+            yield chunk
         
-        # Try to match staff name and field
-        for _, staff in staff_df.iterrows():
-            name = staff['name']
-            name_lower = name.lower()
-            if name_lower in user_input_lower:
-                # Check for skills
-                if 'skill' in user_input_lower:
-                    return f"{name}'s skills are: {staff['skills']}."
-                # Check for role
-                if 'role' in user_input_lower or 'position' in user_input_lower:
-                    return f"{name}'s role is: {staff['role']}."
-                # Check for name
-                if 'name' in user_input_lower:
-                    return f"The staff member's name is: {name}."
-                # General info
-                if any(word in user_input_lower for word in ['info', 'information', 'details', 'about', 'profile']):
-                    return f"{name}: Role - {staff['role']}, Skills - {staff['skills']}."
+        response = "".join(chunks).strip()
         
-        return "I'm sorry, but I couldn't find the information you requested. You can ask about staff (name, skills, role), roster, or leave data. For example: 'What are the skills of Dr. Smith?', 'Show me the roster for John', or 'Who is on leave next week?'"
+        # Add to conversation history
+        self._append_history(
+            {"role": "user", "content": parsed.raw},
+            {"role": "assistant", "content": response},
+        )
+
+    def _append_history(self, *messages: Dict[str, str]):
+        """
+        Append messages to the history, resetting it to head + tail once it grows too long
+        and folding the oldest turns into a one-line summary while it is over the token budget.
+        """
+        # Trimmed in place with a running character count, so no turn copies or re-measures the list
+        history = self.conversation_history
+        history.extend(messages)
+        self._history_chars += _content_chars(messages)
+        if len(history) > _HISTORY_RESET_AT:
+            # Cuts are moved to turn boundaries: error replies are appended without a user message,
+            # so fixed offsets could keep a question while dropping its answer
+            head = _HISTORY_KEEP_HEAD
+            while not _is_turn_start(history, head):
+                head += 1
+            tail = len(history) - _HISTORY_KEEP_TAIL
+            while not _is_turn_start(history, tail):
+                tail -= 1
+            if head < tail:
+                self._history_chars -= _content_chars(history[head:tail])
+                del history[head:tail]
+        while self._history_chars // 4 > _HISTORY_TOKEN_BUDGET and len(history) > 4:
+            # An earlier summary is replaced rather than stacked
+            if history[0]["role"] == "system":
+                self._history_chars -= _content_chars(history[:1])
+                del history[0]
+            end = 1
+            while not _is_turn_start(history, end):
+                end += 1
+            old = history[:end]
+            speaker = "user asked about" if old[0]["role"] == "user" else "assistant said"
+            summary = {"role": "system", "content": f"[Earlier: {speaker} {old[0]['content'][:60]}...]"}
+            history[:end] = [summary]
+            self._history_chars += _content_chars([summary]) - _content_chars(old)
+
+    def _get_staff_df(self) -> pd.DataFrame:
+        """
+        Staff rows with name_lower, name_normalized and name_canonical columns, shared across turns.
+        Re-read from the database after _STAFF_CACHE_TTL seconds or when staff_version changes;
+        callers must treat the frame as read-only.
+        """
+        fetched_at, version, staff_df = self._staff_df_cache
+        current_version = self.data_handler.staff_version
+        if staff_df is None or version != current_version or time.time() - fetched_at > _STAFF_CACHE_TTL:
+            staff_df = self.data_handler.db.get_all_staff()
+            staff_df['name_lower'] = staff_df['name'].astype(str).str.lower()
+            staff_df['name_normalized'] = staff_df['name_lower'].str.strip()
+            # Title dropped and inner whitespace collapsed, for matching the names users type
+            names = staff_df['name_normalized'].str.replace(_TITLE_PREFIX_RE, '', regex=True)
+            staff_df['name_canonical'] = names.str.split().str.join(' ')
+            self._staff_df_cache = (time.time(), current_version, staff_df)
+        return staff_df
+
+    def _get_staff_names_regex(self, staff_df: pd.DataFrame) -> re.Pattern:
+        """Compile a whole-word pattern matching any staff name, rebuilt when the staff frame is replaced."""
+        source, pattern = self._staff_names_regex
+        if source is not staff_df:
+            # Longer names first, so "john smith" wins over "john" where both would match
+            names = sorted({name for name in staff_df['name_lower'] if name}, key=len, reverse=True)
+            pattern = re.compile(r'\b(' + '|'.join(map(re.escape, names)) + r')\b') if names else re.compile(r'(?!)')
+            self._staff_names_regex = (staff_df, pattern)
+        return pattern
+
+    def _get_staff_name_index(self, staff_df: pd.DataFrame) -> Dict[str, List[int]]:
+        """Map each canonical staff name to its row positions, rebuilt when the staff frame is replaced."""
+        source, index = self._staff_name_index
+        if source is not staff_df:
+            index = {}
+            for position, name in enumerate(staff_df['name_canonical'].to_numpy()):
+                index.setdefault(name, []).append(position)
+            self._staff_name_index = (staff_df, index)
+        return index
+
+    def _cached_staff_answer(self, key: str) -> Optional[str]:
+        """Return the keyword-rule answer for this input if the staff rows it came from are still current."""
+        fetched_at, version, staff_df = self._staff_df_cache
+        source, answers = self._staff_answers
+        if (source is None or source is not staff_df or version != self.data_handler.staff_version
+                or time.time() - fetched_at > _STAFF_CACHE_TTL):
+            return None
+        return answers.get(key)
+
+    def _remember_staff_answer(self, key: str, answer: str) -> str:
+        """Store an answer built from the current staff rows and return it."""
+        staff_df = self._staff_df_cache[2]
+        source, answers = self._staff_answers
+        if source is not staff_df:
+            # New staff rows make every earlier answer stale
+            answers = {}
+            self._staff_answers = (staff_df, answers)
+        answers[key] = answer
+        return answer
+
+    def _turn_read(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """Run a read-only database query at most once per chat turn."""
+        if key not in self._turn_reads:
+            self._turn_reads[key] = fetch()
+        return self._turn_reads[key]
 
     def _format_semantic_staff_answer(self, query, staff):
         # Try to answer based on query keywords
@@ -204,32 +731,35 @@ class RosteringChatbot:
     def _get_staff_list_response(self, table: bool = False) -> str:
         """Generate a response showing the current staff list."""
         try:
-            # Always fetch fresh staff data from the database
-            staff_df = self.data_handler.db.get_all_staff()
+            staff_df = self._get_staff_df()
             
             if staff_df.empty:
                 return "Currently, there are no staff members in the database. You can add staff members by saying something like 'Add Dr. Smith as a Senior Doctor with Emergency skills'."
             
             if table:
                 # Return as markdown table
-                display_df = staff_df[['name', 'role', 'skills']].copy()
                 headers = '| Name | Role | Skills |\n'
                 separators = '|---|---|---|\n'
-                rows = '\n'.join(
-                    f"| {row['name']} | {row['role']} | {row['skills']} |" for _, row in display_df.iterrows()
-                )
+                # Whole-column string concatenation instead of a Python loop over rows
+                rows = (
+                    '| ' + staff_df['name'].astype(str) + ' | ' + staff_df['role'].astype(str)
+                    + ' | ' + staff_df['skills'].astype(str) + ' |'
+                ).str.cat(sep='\n')
                 table_md = headers + separators + rows
                 response = f"Here's the current staff list in table format (total {len(staff_df)} members):\n\n{table_md}\n\nYou can add new staff members, delete existing ones, or view specific staff information. Just let me know what you'd like to do!"
                 return response
             else:
                 response = f"Here's the current staff list with {len(staff_df)} members:\n\n"
-                for _, staff in staff_df.iterrows():
-                    response += f"• **{staff['name']}** - {staff['role']}\n"
-                    response += f"  Skills: {staff['skills']}\n\n"
+                response += "".join(
+                    _STAFF_ENTRY_TEMPLATE.format(name=name, role=role, skills=skills)
+                    for name, role, skills in zip(
+                        staff_df['name'].to_numpy(), staff_df['role'].to_numpy(), staff_df['skills'].to_numpy()
+                    )
+                )
                 response += "You can add new staff members, delete existing ones, or view specific staff information. Just let me know what you'd like to do!"
                 return response
         except Exception as e:
-            return f"I'm sorry, but I encountered an error while retrieving the staff list: {str(e)}. Please try again."
+            return f"I'm sorry, but I encountered an error while retrieving the staff list: {e}. Please try again."
 
     def _get_roster_response(self) -> str:
         """Generate a response about the current roster."""
@@ -242,157 +772,123 @@ class RosteringChatbot:
             else:
                 return "The roster is currently empty. You can generate a new roster by saying something like 'Generate a 7-day roster with 3 shifts per day'."
         except Exception as e:
-            return f"I'm sorry, but I encountered an error while retrieving the roster: {str(e)}. Please try again."
+            return f"I'm sorry, but I encountered an error while retrieving the roster: {e}. Please try again."
 
     def _get_leave_response(self) -> str:
         """Generate a response about leave requests."""
         try:
-            # Always fetch fresh leave data from the database
-            leave_requests = self.data_handler.db.get_all_leave_requests()
+            # Always fetch fresh leave data from the database, letting it count and pick the latest rows
+            total = self._turn_read("leave_count", self.data_handler.db.count_leave_requests)
             
-            if not leave_requests:
+            if not total:
                 return "Currently, there are no leave requests in the system. You can add leave requests by saying something like 'Add annual leave for John from 2024-03-15 to 2024-03-20'."
             
-            response = f"Here are the current leave requests ({len(leave_requests)} total):\n\n"
+            response = f"Here are the current leave requests ({total} total):\n\n"
             
-            for req in leave_requests[-5:]:  # Show last 5 requests
-                response += f"• **{req['staff_member']}** - {req['leave_type']}\n"
-                response += f"  {req['start_date']} to {req['end_date']} ({req['duration']} days)\n"
-                response += f"  Status: {req['status']}\n\n"
+            # Show last 5 requests
+            response += "".join(
+                _RECENT_LEAVE_ENTRY_TEMPLATE.format_map(req)
+                for req in self.data_handler.db.get_recent_leave_requests(5)
+            )
             
-            if len(leave_requests) > 5:
-                response += f"... and {len(leave_requests) - 5} more requests.\n\n"
+            if total > 5:
+                response += f"... and {total - 5} more requests.\n\n"
             
             response += "You can add new leave requests, view specific ones, or update existing ones. Just let me know what you'd like to do!"
             
             return response
             
         except Exception as e:
-            return f"I'm sorry, but I encountered an error while retrieving leave requests: {str(e)}. Please try again."
+            return f"I'm sorry, but I encountered an error while retrieving leave requests: {e}. Please try again."
 
-    def _extract_intent_and_parameters(self, user_input: str) -> Dict[str, Any]:
+    def _extract_intent_and_parameters(self, parsed: _ParsedInput) -> Dict[str, Any]:
         """
         Use NLP to extract intent and parameters from natural language input.
         This function uses LLM-based extraction with a robust regex/keyword fallback for synonyms/typos.
-        # TODO: Integrate semantic search for even more flexible question handling.
+        Commands fully parsed by a specific local pattern (marked local_only) skip the LLM call
+        entirely, and rephrased repeats are answered from the semantic cache.
         """
+        local_intent = self._manual_intent_extraction(parsed)
+        # Keyword catch-alls are only a fallback; the LLM still decides for those
+        if local_intent.pop("local_only", False):
+            return local_intent
         try:
-            # Prepare context for intent extraction
             context = self._get_intent_extraction_context()
+            # Always count fresh leave data in the database
+            leave_count = self._turn_read("leave_count", self.data_handler.db.count_leave_requests)
             
-            # Create messages for intent extraction
+            # Create messages for intent extraction; the volatile leave count goes last so the
+            # schema and staff context stay an identical prefix from one call to the next
             messages = [
-                {"role": "system", "content": self._get_intent_extraction_prompt()},
+                self._intent_system_message,
                 {"role": "system", "content": f"Available context:\n{context}"},
-                {"role": "user", "content": user_input}
+                {"role": "system", "content": f"Leave Requests: {leave_count} total"},
+                {"role": "user", "content": parsed.raw}
             ]
             
-            # Get AI response for intent extraction
-            response = self._call_groq(messages)
+            # Rephrasings of an earlier request (same content words, see SemanticCache) reuse its
+            # extraction, provided the staff data and the date (for relative dates) are unchanged
+            context_key = hashlib.sha256(f"{self._today}|{context}".encode()).hexdigest()
+            cached = self._semantic_cache.lookup(parsed.raw, context_key)
+            
+            # Get AI response for intent extraction (deterministic, so repeats can be served from cache)
+            response = cached if cached is not None else self._call_groq(
+                messages, temperature=0.0, stop_when=_json_object_complete
+            )
             
             # Check if we got an API error
             if response.startswith("API_"):
-                print(f"API Error detected: {response}")
-                print("Falling back to manual intent extraction...")
-                return self._manual_intent_extraction(user_input)
+                logger.warning("API error detected: %s; falling back to manual intent extraction", response)
+                return local_intent
             
             # Parse the structured response
             intent_data = self._parse_intent_response(response)
+            if (cached is None and intent_data["intent"] != "NONE"
+                    and not intent_data["intent"].startswith(_WRITE_INTENT_PREFIXES)):
+                self._semantic_cache.add(parsed.raw, context_key, response)
             
             # If parsing failed, try to extract intent manually
             if intent_data["intent"] == "NONE":
-                print("AI parsing returned NONE intent, trying manual extraction...")
-                intent_data = self._manual_intent_extraction(user_input)
+                logger.debug("AI parsing returned NONE intent, trying manual extraction")
+                intent_data = local_intent
             
             return intent_data
             
         except Exception as e:
-            print(f"Error during intent extraction: {str(e)}")
+            logger.error("Error during intent extraction: %s", e)
             # Fallback to manual extraction
-            return self._manual_intent_extraction(user_input)
+            return local_intent
 
     def _get_intent_extraction_prompt(self) -> str:
-        """Get the prompt for intent extraction."""
-        return """You are an intent extraction system for a hospital roster management chatbot. 
-
-Your task is to analyze user input and extract the intent and relevant parameters. Respond ONLY with a JSON object in this exact format:
-
-{
-    "intent": "INTENT_TYPE",
-    "parameters": {
-        "param1": "value1",
-        "param2": "value2"
-    },
-    "confidence": 0.95
-}
-
-Available intents:
-1. "ADD_STAFF" - User wants to add a new staff member
-   Parameters: name (string), role (string), skills (string or list)
-   
-2. "DELETE_STAFF" - User wants to delete a staff member
-   Parameters: name (string)
-   
-3. "ADD_LEAVE" - User wants to add a leave request
-   Parameters: staff_member (string), leave_type (string), start_date (YYYY-MM-DD), end_date (YYYY-MM-DD), reason (string, optional)
-   
-4. "VIEW_LEAVE" - User wants to view leave requests
-   Parameters: staff (string, can be "ALL"), status (string, can be "ALL"), period (string)
-   
-5. "UPDATE_LEAVE" - User wants to update a leave request
-   Parameters: request_id (string), status (string), comment (string, optional)
-   
-6. "GENERATE_ROSTER" - User wants to generate a new roster.
-   Parameters: num_days (integer), shifts_per_day (integer), min_staff_per_shift (integer), max_shifts_per_week (integer)
-   
-7. "VIEW_ROSTER" - User wants to see the current roster in the chat.
-   Parameters: None
-   
-8. "CHECK_LEAVE" - User wants to check upcoming leave
-   Parameters: days (integer), staff (string, can be "ALL")
-   
-9. "QUERY_ROSTER" - User wants to query the roster for staff, day, or date
-   Parameters: staff_name (string), role (string), weekday (string), date (YYYY-MM-DD)
-   
-10. "DELETE_LEAVE" - User wants to delete a leave request
-    Parameters: request_id (string) or staff_member (string) and date (YYYY-MM-DD)
-   
-11. "NONE" - No specific intent detected
-
-Valid roles: ["Senior Doctor", "Doctor", "Senior Nurse", "Nurse", "Specialist"]
-Valid skills: ["Emergency", "ICU", "General", "Surgery", "Pediatrics"]
-Valid leave types: ["Annual Leave", "Sick Leave", "Personal Leave", "Emergency Leave", "Study Leave"]
-Valid statuses: ["Approved", "Pending", "Rejected"]
-Valid periods: ["Past", "Current", "Future", "ALL"]
-
-Extract parameters from natural language. If a parameter is missing or unclear, set it to null or an appropriate default.
-If multiple values are mentioned for a parameter, use the most specific or relevant one.
-For skills, if multiple skills are mentioned, combine them with commas.
-For dates, convert to YYYY-MM-DD format if possible, otherwise use null.
-
-Examples:
-- "Add Dr. Smith as a Senior Doctor with Emergency and ICU skills" → ADD_STAFF with name="Dr. Smith", role="Senior Doctor", skills="Emergency,ICU"
-- "John needs annual leave from March 15 to March 20" → ADD_LEAVE with staff_member="John", leave_type="Annual Leave", start_date="2024-03-15", end_date="2024-03-20"
-- "Show me the current roster" → VIEW_ROSTER
-- "Generate a 7-day roster" → GENERATE_ROSTER with num_days=7
-- "Show me all leave requests" → VIEW_LEAVE with staff="ALL", status="ALL", period="ALL"
-
-Respond with ONLY the JSON object, no additional text."""
+        """Get the prompt for intent extraction: a compact schema sent on every call."""
+        def one_of(choices):
+            return "|".join(choices)
+        return f"""Extract the intent of a hospital roster chatbot user. Respond ONLY with JSON:
+{{"intent":"INTENT","parameters":{{...}},"confidence":0.0-1.0}}
+Intents and parameters (? = optional, null if missing or unclear):
+ADD_STAFF{{name,role:{one_of(VALID_ROLES)},skills:comma-separated {one_of(VALID_SKILLS)}}}
+DELETE_STAFF{{name}}
+ADD_LEAVE{{staff_member,leave_type:{one_of(VALID_LEAVE_TYPES)},start_date,end_date,reason?}}
+VIEW_LEAVE{{staff:name|ALL,status:{one_of(VALID_STATUSES)}|ALL,period:{one_of(VALID_PERIODS)}}}
+UPDATE_LEAVE{{request_id,status:{one_of(VALID_STATUSES)},comment?}}
+GENERATE_ROSTER{{num_days:int,shifts_per_day:int,min_staff_per_shift:int,max_shifts_per_week:int}}
+VIEW_ROSTER{{}} (show current roster)
+CHECK_LEAVE{{days:int,staff:name|ALL}} (upcoming leave)
+QUERY_ROSTER{{staff_name?,role?,weekday?,date?}}
+DELETE_LEAVE{{request_id}} or {{staff_member,date}}
+NONE{{}} (no roster action)
+Dates are YYYY-MM-DD. Examples:
+"Add Dr. Smith as a Senior Doctor with Emergency and ICU skills" -> ADD_STAFF name="Dr. Smith",role="Senior Doctor",skills="Emergency,ICU"
+"John needs annual leave from March 15 to March 20" -> ADD_LEAVE staff_member="John",leave_type="Annual Leave",start_date="2024-03-15",end_date="2024-03-20"
+"Show me all leave requests" -> VIEW_LEAVE staff="ALL",status="ALL",period="ALL"
+Unclear or unrelated input -> NONE with confidence 0."""
 
     def _get_intent_extraction_context(self) -> str:
-        """Get context information for intent extraction."""
+        """Get the stable context information for intent extraction: the staff list."""
         try:
-            # Always fetch fresh staff data from the database
-            staff_df = self.data_handler.db.get_all_staff()
-            staff_info = "Current Staff:\n"
-            for _, staff in staff_df.iterrows():
-                staff_info += f"- {staff['name']} ({staff['role']}): {staff['skills']}\n"
-            # Always fetch fresh leave data from the database
-            leave_requests = self.data_handler.db.get_all_leave_requests()
-            leave_info = f"\nLeave Requests: {len(leave_requests)} total"
-            return staff_info + leave_info
+            return "Current Staff:\n" + self._get_staff_lines()
         except Exception as e:
-            return f"Error getting context: {str(e)}"
+            return f"Error getting context: {e}"
 
     def _parse_intent_response(self, response: str) -> Dict[str, Any]:
         """Parse the AI response for intent extraction."""
@@ -400,16 +896,12 @@ Respond with ONLY the JSON object, no additional text."""
             # Clean the response and extract JSON
             response = response.strip()
             
-            # Remove any markdown formatting
-            if response.startswith("```json"):
-                response = response[7:]
-            if response.endswith("```"):
-                response = response[:-3]
-            
-            response = response.strip()
-            
-            # Parse JSON
-            intent_data = json.loads(response)
+            # Parse the first JSON object, skipping any markdown fence or prose around it
+            # (streamed replies are cut off right after the object)
+            start = response.find("{")
+            if start == -1:
+                return {"intent": "NONE", "parameters": {}, "confidence": 0.0}
+            intent_data, _ = _JSON_DECODER.raw_decode(response, start)
             
             # Validate the structure
             if not isinstance(intent_data, dict):
@@ -429,333 +921,247 @@ Respond with ONLY the JSON object, no additional text."""
             return intent_data
             
         except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {str(e)}")
-            print(f"Response was: {response}")
+            logger.warning("JSON parsing error: %s (response was: %s)", e, response)
             return {"intent": "NONE", "parameters": {}, "confidence": 0.0}
         except Exception as e:
-            print(f"Error parsing intent response: {str(e)}")
+            logger.error("Error parsing intent response: %s", e)
             return {"intent": "NONE", "parameters": {}, "confidence": 0.0}
 
-    def _manual_intent_extraction(self, user_input: str) -> Dict[str, Any]:
-        """Manual intent extraction as fallback."""
-        user_input_lower = user_input.lower()
-        import re
-        
+    def _parse_direct_intent(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Return the intent data if the input is itself an intent JSON object for a known intent, else None."""
+        text = user_input.strip()
+        if not text.startswith("{"):
+            return None
+        intent_data = self._parse_intent_response(text)
+        if intent_data["intent"] not in self._intent_handlers:
+            return None
+        # The user spelled the command out, so there is nothing to be unsure about
+        intent_data["confidence"] = 1.0
+        return intent_data
+
+    def _manual_intent_extraction(self, parsed: _ParsedInput) -> Dict[str, Any]:
+        """
+        Manual intent extraction as fallback. Results from a specific pattern that parsed the
+        whole command carry "local_only": True; those are trusted without asking the LLM.
+        """
+        keywords = _INTENT_KEYWORDS.scan(parsed.lower)
+        for required, detect in self._intent_detectors:
+            if required <= keywords:
+                intent = detect(parsed, keywords)
+                if intent:
+                    return intent
+        return {"intent": "NONE", "parameters": {}, "confidence": 0.0}
+
+    def _detect_roster_intent(self, parsed: _ParsedInput, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """Roster generation, viewing and queries about who works when."""
         # Intent: Generate Roster
-        if "generate" in user_input_lower and any(p in user_input_lower for p in ["roster", "schedule", "shift"]):
+        if "generate" in keywords and "generate_target" in keywords:
             # Extract parameters if available
-            days_match = re.search(r"(\d+)\s*day", user_input_lower)
+            days_match = _DAYS_RE.search(parsed.lower)
             params = {}
             if days_match:
                 params["num_days"] = int(days_match.group(1))
             return {"intent": "GENERATE_ROSTER", "parameters": params, "confidence": 0.95}
 
         # Intent: View Roster (if not generating)
-        view_roster_keywords = ["show", "view", "display", "see", "what's", "what is"]
-        if any(k in user_input_lower for k in view_roster_keywords) and "roster" in user_input_lower:
+        if "view_roster" in keywords and "roster" in keywords:
             # Ensure it's not a query for a specific person/day
-            if not re.search(r"(of|for|on)\s+([a-zA-Z0-9\s]+)", user_input_lower):
+            if not _ROSTER_TARGET_RE.search(parsed.lower):
                  return {"intent": "VIEW_ROSTER", "parameters": {}, "confidence": 0.95}
 
-        # Query roster for staff, day, or date
-        query_match = re.search(r"roster for ([a-zA-Z\s]+)", user_input_lower)
-        if query_match:
-            return {"intent": "QUERY_ROSTER", "parameters": {"staff_name": query_match.group(1).strip()}, "confidence": 0.9}
-        
-        # Roster viewing patterns (these should only show in chat, never rerun/tab change)
-        roster_view_patterns = [
-            r"\b(show|view|display|see|what(?:'s| is)) (?:me )?(?:the )?(?:current )?roster( data)?\b",
-            r"\bview (?:the )?roster( data)?\b",
-            r"\bshow (?:the )?roster( data)?\b",
-            r"\bwhat(?:'s| is) (?:the )?roster( data)?\b",
-            r"\broster( data)?\b"
-        ]
-        for pattern in roster_view_patterns:
-            if re.search(pattern, user_input_lower):
-                # If the query does NOT mention a staff name, date, or role/weekday, treat as VIEW_ROSTER
-                if not re.search(r"(shift timings? of|who is working on|which (doctor|nurse|staff|employee|specialist) is available on|show me [a-zA-Z\s]+'s shifts)", user_input_lower):
-                    return {
-                        "intent": "VIEW_ROSTER",
-                        "parameters": {},
-                        "confidence": 0.95
-                    }
+        # Both of these patterns contain "roster", so they cannot match without it
+        if "roster" in keywords:
+            # Query roster for staff, day, or date
+            query_match = _ROSTER_FOR_RE.search(parsed.lower)
+            if query_match:
+                return {"intent": "QUERY_ROSTER", "parameters": {"staff_name": query_match.group(1).strip()}, "confidence": 0.9}
+            
+            # Roster viewing patterns (these should only show in chat, never rerun/tab change)
+            for pattern in _ROSTER_VIEW_PATTERNS:
+                if pattern.search(parsed.lower):
+                    # If the query does NOT mention a staff name, date, or role/weekday, treat as VIEW_ROSTER
+                    if not _ROSTER_QUERY_RE.search(parsed.lower):
+                        return {
+                            "intent": "VIEW_ROSTER",
+                            "parameters": {},
+                            "confidence": 0.95
+                        }
         # Query roster for staff or day (only if not a generic view request)
-        staff_match = re.search(r"shift timings? of ([a-zA-Z\s]+)", user_input_lower)
+        staff_match = _SHIFT_TIMINGS_RE.search(parsed.lower)
         if staff_match:
             staff_name = staff_match.group(1).strip().title()
-            return {"intent": "QUERY_ROSTER", "parameters": {"staff_name": staff_name}, "confidence": 0.95}
-        available_on_day = re.search(r"which (doctor|nurse|staff|employee|specialist) is available on ([a-zA-Z]+)", user_input_lower)
+            return {"intent": "QUERY_ROSTER", "parameters": {"staff_name": staff_name}, "confidence": 0.95, "local_only": True}
+        available_on_day = _AVAILABLE_ON_DAY_RE.search(parsed.lower)
         if available_on_day:
             role = available_on_day.group(1).title()
             day = available_on_day.group(2).title()
-            return {"intent": "QUERY_ROSTER", "parameters": {"role": role, "weekday": day}, "confidence": 0.95}
-        who_on_date = re.search(r"who is working on (\d{4}-\d{2}-\d{2})", user_input_lower)
+            return {"intent": "QUERY_ROSTER", "parameters": {"role": role, "weekday": day}, "confidence": 0.95, "local_only": True}
+        who_on_date = _WHO_ON_DATE_RE.search(parsed.lower)
         if who_on_date:
             date = who_on_date.group(1)
-            return {"intent": "QUERY_ROSTER", "parameters": {"date": date}, "confidence": 0.95}
-        staff_shifts = re.search(r"show me ([a-zA-Z\s]+)'s shifts", user_input_lower)
+            return {"intent": "QUERY_ROSTER", "parameters": {"date": date}, "confidence": 0.95, "local_only": True}
+        staff_shifts = _STAFF_SHIFTS_RE.search(parsed.lower)
         if staff_shifts:
             staff_name = staff_shifts.group(1).strip().title()
-            return {"intent": "QUERY_ROSTER", "parameters": {"staff_name": staff_name}, "confidence": 0.95}
+            return {"intent": "QUERY_ROSTER", "parameters": {"staff_name": staff_name}, "confidence": 0.95, "local_only": True}
         # Fallback: if 'roster' is in the query, treat as VIEW_ROSTER (but not generate)
-        if 'roster' in user_input_lower and 'generate' not in user_input_lower:
+        if "roster" in keywords and "generate" not in keywords:
             return {"intent": "VIEW_ROSTER", "parameters": {}, "confidence": 0.9}
-        
-        # Check for ADD_STAFF intent
-        if any(word in user_input_lower for word in ["add", "create", "new"]) and any(word in user_input_lower for word in ["staff", "doctor", "nurse", "member"]):
-            # Try to extract name, role, and skills
-            import re
-            
-            # Extract name (usually after "add" or "create")
-            name_match = re.search(r'(?:add|create)\s+([A-Za-z\s]+?)(?:\s+as|\s+with|\s+skills|$)', user_input, re.IGNORECASE)
+        return None
+
+    def _detect_add_staff(self, parsed: _ParsedInput, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """ADD_STAFF with name, role and skills when the input names them."""
+        # Try to extract name, role, and skills
+        # Extract name (usually after "add" or "create")
+        name_match = _ADD_STAFF_NAME_RE.search(parsed.raw)
+        name = name_match.group(1).strip() if name_match else None
+        
+        # If no name found, try to extract from the beginning
+        if not name:
+            # Look for patterns like "Add Dr. Smith" or "Add John Smith"
+            name_match = _ADD_STAFF_TITLED_NAME_RE.search(parsed.raw)
             name = name_match.group(1).strip() if name_match else None
-            
-            # If no name found, try to extract from the beginning
-            if not name:
-                # Look for patterns like "Add Dr. Smith" or "Add John Smith"
-                name_match = re.search(r'(?:add|create)\s+([A-Za-z\s\.]+?)(?:\s+as|\s+with|\s+skills|$)', user_input, re.IGNORECASE)
-                name = name_match.group(1).strip() if name_match else None
-            
-            # Extract role
-            roles = ["Senior Doctor", "Doctor", "Senior Nurse", "Nurse", "Specialist"]
-            role = None
-            for r in roles:
-                if r.lower() in user_input_lower:
-                    role = r
-                    break
-            
-            # Extract skills - look for skills mentioned in the text
-            skills = ["Emergency", "ICU", "General", "Surgery", "Pediatrics"]
-            found_skills = []
-            for skill in skills:
-                if skill.lower() in user_input_lower:
-                    found_skills.append(skill)
-            
-            # If no skills found, try to extract from "skills are" or "skills in" patterns
-            if not found_skills:
-                skills_match = re.search(r'skills?\s+(?:are|in)\s+([A-Za-z\s,]+)', user_input, re.IGNORECASE)
-                if skills_match:
-                    skills_text = skills_match.group(1).strip()
-                    for skill in skills:
-                        if skill.lower() in skills_text.lower():
-                            found_skills.append(skill)
-            
-            # If still no skills, try to extract from "with" patterns
-            if not found_skills:
-                with_match = re.search(r'with\s+([A-Za-z\s,]+)', user_input, re.IGNORECASE)
-                if with_match:
-                    with_text = with_match.group(1).strip()
-                    for skill in skills:
-                        if skill.lower() in with_text.lower():
-                            found_skills.append(skill)
-            
-            if name and role and found_skills:
-                return {
-                    "intent": "ADD_STAFF",
-                    "parameters": {
-                        "name": name,
-                        "role": role,
-                        "skills": ",".join(found_skills)
-                    },
-                    "confidence": 0.8
-                }
-            elif name and role:
-                # If we have name and role but no skills, ask for skills
-                return {
-                    "intent": "ADD_STAFF",
-                    "parameters": {
-                        "name": name,
-                        "role": role,
-                        "skills": None
-                    },
-                    "confidence": 0.6
-                }
         
-        # Check for DELETE_STAFF intent
-        if any(word in user_input_lower for word in ["delete", "remove", "fire", "terminate"]) and any(word in user_input_lower for word in ["staff", "doctor", "nurse", "member", "employee"]):
-            import re
-            
-            # Try multiple patterns to extract the name
-            name = None
-            
-            # Pattern 1: "delete/remove/fire [name]"
-            patterns = [
-                r'(?:delete|remove|fire|terminate)\s+([A-Za-z\s\.]+?)(?:\s+from|\s+the|\s+staff|\s+member|$)',
-                r'(?:delete|remove|fire|terminate)\s+([A-Za-z\s\.]+?)(?:\s+as|\s+with|\s+skills|$)',
-                r'(?:delete|remove|fire|terminate)\s+([A-Za-z\s\.]+?)(?:\s+who|\s+that|\s+has|$)'
-            ]
-            
-            for pattern in patterns:
-                name_match = re.search(pattern, user_input, re.IGNORECASE)
-                if name_match:
-                    name = name_match.group(1).strip()
+        # Roles and skills mentioned anywhere, found in one scan
+        mentioned = _STAFF_VOCABULARY.scan(parsed.lower)
+        
+        # Extract role; the first listed wins, so "Senior Doctor" beats "Doctor"
+        role = next((r for r in VALID_ROLES if r in mentioned), None)
+        
+        # Extract skills - look for skills mentioned in the text
+        found_skills = [skill for skill in VALID_SKILLS if skill in mentioned]
+        
+        # If no skills found, try to extract from "skills are" or "skills in" patterns
+        if not found_skills:
+            skills_match = _SKILLS_LIST_RE.search(parsed.raw)
+            if skills_match:
+                mentioned = _STAFF_VOCABULARY.scan(skills_match.group(1).strip().lower())
+                found_skills = [skill for skill in VALID_SKILLS if skill in mentioned]
+        
+        # If still no skills, try to extract from "with" patterns
+        if not found_skills:
+            with_match = _WITH_LIST_RE.search(parsed.raw)
+            if with_match:
+                mentioned = _STAFF_VOCABULARY.scan(with_match.group(1).strip().lower())
+                found_skills = [skill for skill in VALID_SKILLS if skill in mentioned]
+        
+        if name and role and found_skills:
+            return {
+                "intent": "ADD_STAFF",
+                "parameters": {
+                    "name": name,
+                    "role": role,
+                    "skills": ",".join(found_skills)
+                },
+                "confidence": 0.8
+            }
+        elif name and role:
+            # If we have name and role but no skills, ask for skills
+            return {
+                "intent": "ADD_STAFF",
+                "parameters": {
+                    "name": name,
+                    "role": role,
+                    "skills": None
+                },
+                "confidence": 0.6
+            }
+        return None
+
+    def _detect_delete_staff(self, parsed: _ParsedInput, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """DELETE_STAFF with the name following the delete verb."""
+        name = None
+        
+        # "delete/remove/fire [name]"; the pattern only captures letters, dots and spaces
+        name_match = _DELETE_STAFF_NAME_RE.search(parsed.raw)
+        if name_match:
+            # Remove common words that might be captured
+            name = _NAME_FILLER_RE.sub('', name_match.group(1)).strip()
+        
+        # If no usable name, take the single word right after the verb
+        if not name or len(name) < 2:
+            words = parsed.raw.split()
+            for i, word in enumerate(parsed.tokens[:-1]):
+                potential_name = words[i + 1]
+                if word in _DELETE_STAFF_VERBS and potential_name.isascii() and potential_name.isalpha():
+                    name = potential_name
                     break
-            
-            # If still no name, try to extract from the beginning
-            if not name:
-                # Look for patterns like "Delete Dr. Smith" or "Remove John Smith"
-                name_match = re.search(r'(?:delete|remove|fire|terminate)\s+([A-Za-z\s\.]+?)(?:\s+from|\s+the|$)', user_input, re.IGNORECASE)
-                name = name_match.group(1).strip() if name_match else None
-            
-            # Clean up the name (remove extra words)
-            if name:
-                # Remove common words that might be captured
-                name = re.sub(r'\b(?:from|the|staff|member|employee|who|that|has|as|with|skills)\b', '', name, flags=re.IGNORECASE)
-                name = name.strip()
-                
-                # If name is too short or contains invalid characters, try to extract better
-                if len(name) < 2 or not re.match(r'^[A-Za-z\s\.]+$', name):
-                    # Try to find a proper name in the input
-                    words = user_input.split()
-                    for i, word in enumerate(words):
-                        if word.lower() in ['delete', 'remove', 'fire', 'terminate']:
-                            if i + 1 < len(words):
-                                potential_name = words[i + 1]
-                                if re.match(r'^[A-Za-z]+$', potential_name):
-                                    name = potential_name
-                                    break
-            
-            if name and len(name) >= 2:
-                return {
-                    "intent": "DELETE_STAFF",
-                    "parameters": {"name": name},
-                    "confidence": 0.8
-                }
         
-        # Check for ADD_LEAVE intent (improved)
-        add_leave_patterns = [
-            # e.g. add leave for moktik for 2 days annual leave
-            r"add leave for ([a-zA-Z]+) for (\d+) days? ([a-zA-Z ]+)?",
-            # e.g. moktik needs 2 days annual leave from tomorrow
-            r"([a-zA-Z]+) needs (\d+) days? ([a-zA-Z ]+)? from ([a-zA-Z0-9\-]+)",
-            # e.g. add leave for moktik from 2024-06-01 to 2024-06-02
-            r"add leave for ([a-zA-Z]+) from (\d{4}-\d{2}-\d{2}) to (\d{4}-\d{2}-\d{2}) ?([a-zA-Z ]+)?",
-            # e.g. add annual leave for moktik from 2024-06-01 to 2024-06-02
-            r"add ([a-zA-Z ]+) for ([a-zA-Z]+) from (\d{4}-\d{2}-\d{2}) to (\d{4}-\d{2}-\d{2})",
-            # e.g. add leave for moktik for 2 days
-            r"add leave for ([a-zA-Z]+) for (\d+) days?"
-        ]
-        for pattern in add_leave_patterns:
-            m = re.search(pattern, user_input_lower)
-            if m:
-                from datetime import datetime, timedelta
-                today = datetime.now().date()
-                params = {}
-                if pattern == add_leave_patterns[0]:
-                    # add leave for moktik for 2 days annual leave
-                    params['staff_member'] = m.group(1).capitalize()
-                    duration = int(m.group(2))
-                    params['duration'] = duration
-                    params['leave_type'] = m.group(3).strip().title() if m.group(3) else 'Annual Leave'
-                    params['start_date'] = today.strftime('%Y-%m-%d')
-                    params['end_date'] = (today + timedelta(days=duration-1)).strftime('%Y-%m-%d')
-                elif pattern == add_leave_patterns[1]:
-                    # moktik needs 2 days annual leave from tomorrow
-                    params['staff_member'] = m.group(1).capitalize()
-                    duration = int(m.group(2))
-                    params['duration'] = duration
-                    params['leave_type'] = m.group(3).strip().title() if m.group(3) else 'Annual Leave'
-                    from_date = m.group(4)
-                    # Parse 'from' date (support 'tomorrow', 'today', or YYYY-MM-DD)
-                    if from_date == 'tomorrow':
-                        start = today + timedelta(days=1)
-                    elif from_date == 'today':
-                        start = today
-                    else:
-                        try:
-                            start = datetime.strptime(from_date, '%Y-%m-%d').date()
-                        except Exception:
-                            start = today
-                    params['start_date'] = start.strftime('%Y-%m-%d')
-                    params['end_date'] = (start + timedelta(days=duration-1)).strftime('%Y-%m-%d')
-                elif pattern == add_leave_patterns[2]:
-                    # add leave for moktik from 2024-06-01 to 2024-06-02
-                    params['staff_member'] = m.group(1).capitalize()
-                    params['start_date'] = m.group(2)
-                    params['end_date'] = m.group(3)
-                    params['leave_type'] = m.group(4).strip().title() if m.group(4) else 'Annual Leave'
-                    # Calculate duration
-                    try:
-                        start_dt = datetime.strptime(params['start_date'], '%Y-%m-%d')
-                        end_dt = datetime.strptime(params['end_date'], '%Y-%m-%d')
-                        params['duration'] = (end_dt - start_dt).days + 1
-                    except Exception:
-                        params['duration'] = 1
-                elif pattern == add_leave_patterns[3]:
-                    # add annual leave for moktik from 2024-06-01 to 2024-06-02
-                    params['leave_type'] = m.group(1).strip().title()
-                    params['staff_member'] = m.group(2).capitalize()
-                    params['start_date'] = m.group(3)
-                    params['end_date'] = m.group(4)
-                    try:
-                        start_dt = datetime.strptime(params['start_date'], '%Y-%m-%d')
-                        end_dt = datetime.strptime(params['end_date'], '%Y-%m-%d')
-                        params['duration'] = (end_dt - start_dt).days + 1
-                    except Exception:
-                        params['duration'] = 1
-                elif pattern == add_leave_patterns[4]:
-                    # add leave for moktik for 2 days
-                    params['staff_member'] = m.group(1).capitalize()
-                    duration = int(m.group(2))
-                    params['duration'] = duration
-                    params['leave_type'] = 'Annual Leave'
-                    params['start_date'] = today.strftime('%Y-%m-%d')
-                    params['end_date'] = (today + timedelta(days=duration-1)).strftime('%Y-%m-%d')
-                return {
-                    "intent": "ADD_LEAVE",
-                    "parameters": params,
-                    "confidence": 0.9
-                }
+        if name and len(name) >= 2:
+            return {
+                "intent": "DELETE_STAFF",
+                "parameters": {"name": name},
+                "confidence": 0.8
+            }
+        return None
+
+    def _detect_add_leave(self, parsed: _ParsedInput, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """ADD_LEAVE in one of the supported phrasings, with its dates worked out."""
+        m = _ADD_LEAVE_RE.search(parsed.lower)
+        if m:
+            params = _ADD_LEAVE_PARAM_BUILDERS[m.lastgroup](m, self._today)
+            # Only a known leave type with resolved dates is booked without the LLM; anything
+            # else (e.g. 'from next monday') is just the fallback if the LLM call fails
+            fully_parsed = (
+                params['leave_type'] in VALID_LEAVE_TYPES
+                and _iso_date(params.get('start_date')) is not None
+                and _iso_date(params.get('end_date')) is not None
+            )
+            return {
+                "intent": "ADD_LEAVE",
+                "parameters": params,
+                "confidence": 0.9,
+                "local_only": fully_parsed
+            }
         # fallback: old logic
-        if any(word in user_input_lower for word in ["leave", "vacation", "absence"]) and any(word in user_input_lower for word in ["add", "request", "need"]):
+        if "leave" in keywords:
             return {
                 "intent": "ADD_LEAVE",
                 "parameters": {},
                 "confidence": 0.6
             }
-        
-        # Check for VIEW_LEAVE intent
-        if any(word in user_input_lower for word in ["show", "view", "see", "list"]) and any(word in user_input_lower for word in ["leave", "vacation", "absence"]):
+        return None
+
+    def _detect_view_leave(self, parsed: _ParsedInput, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """VIEW_LEAVE over every request; the handler narrows it down from the parameters."""
+        return {
+            "intent": "VIEW_LEAVE",
+            "parameters": {"staff": "ALL", "status": "ALL", "period": "ALL"},
+            "confidence": 0.8
+        }
+
+    def _detect_delete_leave(self, parsed: _ParsedInput, keywords: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """DELETE_LEAVE by request ID, or by staff name and date."""
+        # Try to extract request ID
+        id_match = _REQUEST_ID_RE.search(parsed.lower)
+        if id_match:
             return {
-                "intent": "VIEW_LEAVE",
-                "parameters": {"staff": "ALL", "status": "ALL", "period": "ALL"},
-                "confidence": 0.8
+                "intent": "DELETE_LEAVE",
+                "parameters": {"request_id": id_match.group(1)},
+                "confidence": 0.9,
+                "local_only": True
             }
-        
-        # Check for DELETE_LEAVE intent
-        if any(word in user_input_lower for word in ["delete", "remove", "cancel"]) and any(word in user_input_lower for word in ["leave", "vacation", "absence", "request"]):
-            import re
-            # Try to extract request ID
-            id_match = re.search(r'request\s*(\d+)', user_input_lower)
-            if id_match:
-                return {
-                    "intent": "DELETE_LEAVE",
-                    "parameters": {"request_id": id_match.group(1)},
-                    "confidence": 0.9
-                }
-            # Try to extract staff name and date
-            name_match = re.search(r'(?:for|of)\s+([A-Za-z]+)', user_input_lower)
-            date_match = re.search(r'on\s+(\d{4}-\d{2}-\d{2})', user_input_lower)
-            params = {}
-            if name_match:
-                params["staff_member"] = name_match.group(1)
-            if date_match:
-                params["date"] = date_match.group(1)
-            if params:
-                return {
-                    "intent": "DELETE_LEAVE",
-                    "parameters": params,
-                    "confidence": 0.7
-                }
+        # Try to extract staff name and date
+        name_match = _LEAVE_FOR_NAME_RE.search(parsed.lower)
+        date_match = _LEAVE_ON_DATE_RE.search(parsed.lower)
+        params = {}
+        if name_match:
+            params["staff_member"] = name_match.group(1)
+        if date_match:
+            params["date"] = date_match.group(1)
+        if params:
             return {
                 "intent": "DELETE_LEAVE",
-                "parameters": {},
-                "confidence": 0.5
+                "parameters": params,
+                "confidence": 0.7
             }
-        
-        return {"intent": "NONE", "parameters": {}, "confidence": 0.0}
+        return {
+            "intent": "DELETE_LEAVE",
+            "parameters": {},
+            "confidence": 0.5
+        }
 
-    def _execute_intent(self, intent_data: Dict[str, Any]) -> str:
+    def _execute_intent(self, intent_data: Dict[str, Any]) -> Union[str, Iterator[str]]:
         """Execute the detected intent and return a human-readable response."""
         intent = intent_data["intent"]
         params = intent_data["parameters"]
@@ -765,82 +1171,38 @@ Respond with ONLY the JSON object, no additional text."""
         if confidence < 0.7:
             return self._ask_for_clarification(intent, params)
         
-        # Ensure Streamlit is available for session state manipulation
-        import streamlit as st
-
+        # Reject out-of-range parameter values before dispatching
+        invalid = self._validate_param_choices(intent, params)
+        if invalid:
+            return invalid
+        
+        handler = self._intent_handlers.get(intent)
+        if handler is None:
+            return "I'm not sure what you'd like me to do. Could you please rephrase your request?"
         try:
-            if intent == "ADD_STAFF":
-                return self._execute_add_staff(params)
-            
-            elif intent == "DELETE_STAFF":
-                return self._execute_delete_staff(params)
-            
-            elif intent == "ADD_LEAVE":
-                return self._execute_add_leave(params)
-            
-            elif intent == "DELETE_LEAVE":
-                return self._execute_delete_leave(params)
-            
-            elif intent == "VIEW_LEAVE":
-                return self._execute_view_leave(params)
-            
-            elif intent == "UPDATE_LEAVE":
-                return self._execute_update_leave(params)
-            
-            elif intent == "GENERATE_ROSTER":
-                # Always navigate to roster tab for generation
-                return self._execute_generate_roster(params)
-            
-            elif intent == "VIEW_ROSTER":
-                # Show roster in chat
-                return self._get_roster_response()
-            
-            elif intent == "CHECK_LEAVE":
-                return self._execute_check_leave(params)
-            
-            elif intent == "QUERY_ROSTER":
-                return self._execute_query_roster(params)
-            
-            else:
-                return "I'm not sure what you'd like me to do. Could you please rephrase your request?"
-                
+            return handler(params)
         except Exception as e:
-            return f"I apologize, but I encountered an error while processing your request: {str(e)}. Please try again."
+            return f"I apologize, but I encountered an error while processing your request: {e}. Please try again."
+
+    def _validate_param_choices(self, intent: str, params: Dict[str, Any]):
+        """Return an error message for the first parameter outside its allowed values, else None."""
+        for param, (label, allowed, hint) in _INTENT_PARAM_CHOICES.get(intent, {}).items():
+            value = params.get(param)
+            if value and (not isinstance(value, str) or value not in allowed):
+                return f"I'm sorry, but '{value}' is not a valid {label}. {hint}"
+        return None
 
     def _ask_for_clarification(self, intent: str, params: Dict[str, Any]) -> str:
         """Ask for clarification when intent confidence is low."""
-        if intent == "ADD_STAFF":
-            missing = []
-            if not params.get("name"):
-                missing.append("staff member's name")
-            if not params.get("role"):
-                missing.append("their role")
-            if not params.get("skills"):
-                missing.append("their skills")
-            
-            if missing:
-                return f"I'd like to help you add a new staff member, but I need some clarification. Could you please provide: {', '.join(missing)}?"
-            else:
-                return "I think you want to add a new staff member, but I'm not entirely sure. Could you please rephrase your request?"
-        
-        elif intent == "ADD_LEAVE":
-            missing = []
-            if not params.get("staff_member"):
-                missing.append("who is requesting leave")
-            if not params.get("leave_type"):
-                missing.append("what type of leave")
-            if not params.get("start_date"):
-                missing.append("when the leave starts")
-            if not params.get("end_date"):
-                missing.append("when the leave ends")
-            
-            if missing:
-                return f"I'd like to help you add a leave request, but I need some clarification. Could you please provide: {', '.join(missing)}?"
-            else:
-                return "I think you want to add a leave request, but I'm not entirely sure. Could you please rephrase your request?"
+        if intent not in _CLARIFICATION_PROMPTS:
+            return "I'm not entirely sure what you'd like me to do. Could you please rephrase your request more clearly?"
         
+        action, fields = _CLARIFICATION_PROMPTS[intent]
+        missing = [question for field, question in fields if not params.get(field)]
+        if missing:
+            return f"I'd like to help you {action}, but I need some clarification. Could you please provide: {', '.join(missing)}?"
         else:
-            return "I'm not entirely sure what you'd like me to do. Could you please rephrase your request more clearly?"
+            return f"I think you want to {action}, but I'm not entirely sure. Could you please rephrase your request?"
 
     def _execute_add_staff(self, params: Dict[str, Any]) -> str:
         """Execute ADD_STAFF intent."""
@@ -855,32 +1217,22 @@ Respond with ONLY the JSON object, no additional text."""
             if not skills: missing.append("skills")
             return f"I need the following information to add a staff member: {', '.join(missing)}. Could you please provide these details?"
         
-        # Validate role and skills
-        valid_roles = ["Senior Doctor", "Doctor", "Senior Nurse", "Nurse", "Specialist"]
-        valid_skills = ["Emergency", "ICU", "General", "Surgery", "Pediatrics"]
-        
-        if role not in valid_roles:
-            return f"I'm sorry, but '{role}' is not a valid role. Valid roles are: {', '.join(valid_roles)}"
-        
-        # Convert skills to list if it's a string
+        # Convert skills to list if it's a string (one strip per entry; blank entries from stray commas are dropped)
         if isinstance(skills, str):
-            skills_list = [s.strip() for s in skills.split(',')]
+            skills_list = [s for s in (part.strip() for part in skills.split(',')) if s]
         else:
             skills_list = skills
         
         # Validate skills
-        invalid_skills = [skill for skill in skills_list if skill not in valid_skills]
+        invalid_skills = [skill for skill in skills_list if skill not in _VALID_SKILLS_SET]
         if invalid_skills:
-            return f"I'm sorry, but the following skills are not valid: {', '.join(invalid_skills)}. Valid skills are: {', '.join(valid_skills)}"
+            return f"I'm sorry, but the following skills are not valid: {', '.join(invalid_skills)}. {_VALID_SKILLS_MSG}"
         
         # Add staff member
-        import streamlit as st
         success = self.data_handler.add_staff_member(name, role, ', '.join(skills_list))
         
         if success:
-            # Refresh the data handler's staff data without re-initializing the chatbot
-            self.data_handler.staff_data = self.data_handler.db.get_all_staff()
-            
+            # add_staff_member already refreshed data_handler.staff_data; the chatbot keeps its state
             return f"Perfect! I've successfully added {name} as a {role} with skills in {', '.join(skills_list)} to the staff database. They are now available for roster assignments."
         else:
             return f"I'm sorry, but I encountered an error while adding {name} to the database. Please try again or contact support if the issue persists."
@@ -892,122 +1244,107 @@ Respond with ONLY the JSON object, no additional text."""
         if not name:
             return "I need the name of the staff member you'd like to delete. Could you please provide their name?"
         
-        import streamlit as st
-        staff_df = self.data_handler.staff_data
+        # Shared frame with the names already normalized; read-only here
+        staff_df = self._get_staff_df()
         
         if staff_df.empty:
             return "There are no staff members in the database."
         
-        # Enhanced name normalization:
-        # 1. Strip whitespace
-        # 2. Convert to lowercase
-        # 3. Remove titles (Dr., Mr., Mrs., etc)
-        # 4. Remove extra spaces between words
-        name_normalized = name.strip().lower()
-        name_normalized = re.sub(r'^(dr\.|mr\.|mrs\.|ms\.|prof\.)\s+', '', name_normalized)
-        name_normalized = ' '.join(name_normalized.split())
-        
-        # Create normalized version of staff names
-        staff_df = staff_df.copy()
-        staff_df['name_normalized'] = staff_df['name'].astype(str).apply(lambda x: ' '.join(
-            re.sub(r'^(dr\.|mr\.|mrs\.|ms\.|prof\.)\s+', '', x.strip().lower()).split()
-        ))
-        
-        # Try exact match first (normalized)
-        staff_to_delete = staff_df[staff_df['name_normalized'] == name_normalized]
-        
-        # If not found, try contained match (normalized)
-        if staff_to_delete.empty:
-            staff_to_delete = staff_df[staff_df['name_normalized'].str.contains(name_normalized, na=False)]
-        
-        # If still not found, try fuzzy matching
-        if staff_to_delete.empty:
-            from difflib import SequenceMatcher
-            
-            def similarity_ratio(a, b):
-                return SequenceMatcher(None, a, b).ratio()
-            
-            # Calculate similarity scores
-            similarity_scores = staff_df['name_normalized'].apply(
-                lambda x: similarity_ratio(x, name_normalized)
-            )
+        # Fast path: the name matches a staff member exactly
+        exact_match = self.data_handler.get_staff_by_name().get(name.strip())
+        if exact_match is not None:
+            exact_name = name.strip()
+            staff_id, role = exact_match
+        else:
+            # Enhanced name normalization:
+            # 1. Strip whitespace
+            # 2. Convert to lowercase
+            # 3. Remove titles (Dr., Mr., Mrs., etc)
+            # 4. Remove extra spaces between words
+            name_normalized = name.strip().lower()
+            name_normalized = _TITLE_PREFIX_RE.sub('', name_normalized)
+            name_normalized = ' '.join(name_normalized.split())
+            
+            # Try exact match first (normalized), looked up in the name index
+            staff_to_delete = staff_df.iloc[self._get_staff_name_index(staff_df).get(name_normalized, [])]
+            
+            # If not found, try contained match (normalized)
+            if staff_to_delete.empty:
+                staff_to_delete = staff_df[staff_df['name_canonical'].str.contains(name_normalized, na=False)]
+            
+            # If still not found, try fuzzy matching
+            if staff_to_delete.empty:
+                # The matcher caches its analysis of the second sequence, so the typed name is set
+                # once; the cheap upper bounds rule out most rows before the full ratio is computed
+                matcher = SequenceMatcher(None, b=name_normalized)
+            
+                def is_close(candidate):
+                    matcher.set_seq1(candidate)
+                    return matcher.real_quick_ratio() > 0.6 and matcher.quick_ratio() > 0.6 and matcher.ratio() > 0.6
+            
+                # Find closest matches (similarity > 0.6)
+                close_matches = staff_df[[
+                    isinstance(candidate, str) and is_close(candidate)
+                    for candidate in staff_df['name_canonical'].to_numpy()
+                ]]
+            
+                if not close_matches.empty:
+                    matches = close_matches['name'].tolist()
+                    return f"I couldn't find an exact match for '{name}'. Did you mean one of these: {', '.join(matches)}? Please specify the exact name you want to delete."
+                else:
+                    # Show available staff names to help the user
+                    available_names = staff_df['name'].tolist()
+                    return f"I couldn't find a staff member named '{name}' in the database. Available staff members are: {', '.join(available_names)}. Please check the spelling and try again."
             
-            # Find closest matches (similarity > 0.6)
-            close_matches = staff_df[similarity_scores > 0.6]
+            # If multiple matches found, ask for clarification
+            if len(staff_to_delete) > 1:
+                matches = staff_to_delete['name'].tolist()
+                return f"I found multiple staff members with similar names: {', '.join(matches)}. Please specify the exact name you want to delete."
             
-            if not close_matches.empty:
-                matches = close_matches['name'].tolist()
-                return f"I couldn't find an exact match for '{name}'. Did you mean one of these: {', '.join(matches)}? Please specify the exact name you want to delete."
-            else:
-                # Show available staff names to help the user
-                available_names = staff_df['name'].tolist()
-                return f"I couldn't find a staff member named '{name}' in the database. Available staff members are: {', '.join(available_names)}. Please check the spelling and try again."
-        
-        # If multiple matches found, ask for clarification
-        if len(staff_to_delete) > 1:
-            matches = staff_to_delete['name'].tolist()
-            return f"I found multiple staff members with similar names: {', '.join(matches)}. Please specify the exact name you want to delete."
-        
-        # Get the exact name and ID
-        exact_name = staff_to_delete.iloc[0]['name']
-        staff_id = int(staff_to_delete.iloc[0]['id'])  # Ensure ID is an integer
-        role = staff_to_delete.iloc[0]['role']
+            # Get the exact name and ID
+            exact_name = staff_to_delete.iloc[0]['name']
+            staff_id = int(staff_to_delete.iloc[0]['id'])  # Ensure ID is an integer
+            role = staff_to_delete.iloc[0]['role']
         
-        print(f"[DEBUG] Found staff member to delete: {exact_name} (ID: {staff_id}, Role: {role})")
+        logger.debug("Found staff member to delete: %s (ID: %s, Role: %s)", exact_name, staff_id, role)
         
-        # Double-check the ID exists in the database
-        import sqlite3
-        conn = self.data_handler.db.get_connection()
-        try:
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM staff WHERE id = ?', (staff_id,))
-            if not cursor.fetchone():
-                print(f"[DEBUG] ID {staff_id} not found in database, refreshing data...")
-                # Refresh the data handler's staff data
-                self.data_handler.staff_data = self.data_handler.db.get_all_staff()
-                return f"I encountered a synchronization issue. Please try deleting {exact_name} again."
-        finally:
-            conn.close()
-        
-        # Confirm deletion
+        # Confirm deletion (delete_staff checks the ID still exists inside its transaction)
         success = self.data_handler.delete_staff_member(staff_id)
         
         if success:
-            # Refresh the data handler's staff data
-            self.data_handler.staff_data = self.data_handler.db.get_all_staff()
+            # delete_staff_member already refreshed data_handler.staff_data
             return f"I've successfully removed {exact_name} ({role}) from the staff database. They are no longer available for roster assignments."
         else:
+            # Refresh the data handler's staff data; a missing ID means it was out of date
+            self.data_handler.staff_data = self.data_handler.db.get_all_staff()
+            if not (self.data_handler.staff_data['id'] == staff_id).any():
+                logger.debug("ID %s not found in database, refreshed data", staff_id)
+                return f"I encountered a synchronization issue. Please try deleting {exact_name} again."
             # If deletion failed, try to provide more specific error information
             return f"I encountered an error while trying to remove {exact_name} from the database. This might be because the staff member was already deleted or there was a database error. Please try again, and if the problem persists, contact support."
 
     def _execute_add_leave(self, params: Dict[str, Any]) -> str:
         """Execute ADD_LEAVE intent."""
-        staff_member = params.get("staff_member")
-        leave_type = params.get("leave_type")
-        start_date = params.get("start_date")
-        end_date = params.get("end_date")
-        reason = params.get("reason", "")
-        
-        if not staff_member or not leave_type or not start_date or not end_date:
-            missing = []
-            if not staff_member: missing.append("staff member name")
-            if not leave_type: missing.append("leave type")
-            if not start_date: missing.append("start date")
-            if not end_date: missing.append("end date")
+        missing = [label for field, label in _ADD_LEAVE_REQUIRED_FIELDS if not params.get(field)]
+        if missing:
             return f"I need the following information to add a leave request: {', '.join(missing)}. Could you please provide these details?"
         
-        # Validate leave type
-        valid_leave_types = ["Annual Leave", "Sick Leave", "Personal Leave", "Emergency Leave", "Study Leave"]
-        
-        if leave_type not in valid_leave_types:
-            return f"I'm sorry, but '{leave_type}' is not a valid leave type. Valid types are: {', '.join(valid_leave_types)}"
+        staff_member = params["staff_member"]
+        leave_type = params["leave_type"]
+        start_date = params["start_date"]
+        end_date = params["end_date"]
+        reason = params.get("reason", "")
         
         # Calculate duration
         try:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-            duration = (end_dt - start_dt).days + 1
-        except ValueError:
+            # fromisoformat also accepts other ISO shapes (e.g. 20240315 or 2024-W10-1), which would be
+            # stored verbatim and break the string comparisons on leave dates; only YYYY-MM-DD round-trips
+            start_d = date.fromisoformat(start_date)
+            end_d = date.fromisoformat(end_date)
+            if start_d.isoformat() != start_date or end_d.isoformat() != end_date:
+                raise ValueError("dates must be YYYY-MM-DD")
+            duration = (end_d - start_d).days + 1
+        except (TypeError, ValueError):
             return "I'm sorry, but the date format is invalid. Please provide dates in YYYY-MM-DD format."
         
         # Add leave request (automatically approved since system doesn't have pending logic)
@@ -1020,21 +1357,11 @@ Respond with ONLY the JSON object, no additional text."""
         else:
             return f"I'm sorry, but I encountered an error while adding the leave request for {staff_member}. Please try again or contact support if the issue persists."
 
-    def _execute_view_leave(self, params: Dict[str, Any]) -> str:
+    def _execute_view_leave(self, params: Dict[str, Any]) -> Union[str, Iterator[str]]:
         """Execute VIEW_LEAVE intent."""
-        staff = params.get("staff", "ALL")
-        status = params.get("status", "ALL")
-        period = params.get("period", "ALL")
-        
-        # Validate parameters
-        valid_statuses = ["Approved", "Pending", "Rejected", "ALL"]
-        valid_periods = ["Past", "Current", "Future", "ALL"]
-        
-        if status not in valid_statuses:
-            return f"I'm sorry, but '{status}' is not a valid status. Valid statuses are: {', '.join(valid_statuses)}"
-        
-        if period not in valid_periods:
-            return f"I'm sorry, but '{period}' is not a valid period. Valid periods are: {', '.join(valid_periods)}"
+        staff = params.get("staff") or "ALL"
+        status = params.get("status") or "ALL"
+        period = params.get("period") or "ALL"
         
         # Get leave requests
         leave_requests = self.data_handler.db.get_leave_requests(
@@ -1056,15 +1383,7 @@ Respond with ONLY the JSON object, no additional text."""
             result += f" in the {period.lower()} period"
         result += ":\n\n"
         
-        for req in leave_requests:
-            result += f"• {req['staff_name']} - {req['leave_type']}\n"
-            result += f"  {req['start_date']} to {req['end_date']} ({req['duration']} days)\n"
-            result += f"  Status: {req['status']}\n"
-            if req.get('reason'):
-                result += f"  Reason: {req['reason']}\n"
-            result += "\n"
-        
-        return result
+        return self._iter_leave_listing(result, leave_requests, _LEAVE_ENTRY_TEMPLATE)
 
     def _execute_update_leave(self, params: Dict[str, Any]) -> str:
         """Execute UPDATE_LEAVE intent."""
@@ -1078,11 +1397,6 @@ Respond with ONLY the JSON object, no additional text."""
             if not status: missing.append("new status")
             return f"I need the following information to update a leave request: {', '.join(missing)}. Could you please provide these details?"
         
-        # Validate status
-        valid_statuses = ["Approved", "Pending", "Rejected"]
-        if status not in valid_statuses:
-            return f"I'm sorry, but '{status}' is not a valid status. Valid statuses are: {', '.join(valid_statuses)}"
-        
         # Update leave request
         success = self.data_handler.db.update_leave_request(request_id, status, comment)
         
@@ -1095,32 +1409,19 @@ Respond with ONLY the JSON object, no additional text."""
         """Execute GENERATE_ROSTER intent."""
         try:
             # Ensure all parameters are set and are integers
-            num_days = params.get("num_days")
-            if num_days is None:
-                num_days = 7
-            else:
-                num_days = int(num_days)
-            shifts_per_day = params.get("shifts_per_day")
-            if shifts_per_day is None:
-                shifts_per_day = 3
-            else:
-                shifts_per_day = int(shifts_per_day)
-            min_staff_per_shift = params.get("min_staff_per_shift")
-            if min_staff_per_shift is None:
-                min_staff_per_shift = 2
-            else:
-                min_staff_per_shift = int(min_staff_per_shift)
-            max_shifts_per_week = params.get("max_shifts_per_week")
-            if max_shifts_per_week is None:
-                max_shifts_per_week = 5
-            else:
-                max_shifts_per_week = int(max_shifts_per_week)
+            settings = {
+                key: default if params.get(key) is None else int(params[key])
+                for key, default in _ROSTER_PARAM_DEFAULTS.items()
+            }
             
             # Validate parameters
-            if num_days <= 0 or shifts_per_day <= 0 or min_staff_per_shift <= 0 or max_shifts_per_week <= 0:
+            if any(value <= 0 for value in settings.values()):
                 return "I'm sorry, but all roster parameters must be positive numbers. Please provide valid values."
+            num_days = settings["num_days"]
+            shifts_per_day = settings["shifts_per_day"]
+            min_staff_per_shift = settings["min_staff_per_shift"]
+            max_shifts_per_week = settings["max_shifts_per_week"]
             
-            import streamlit as st
             
             # Validate staff data
             if self.data_handler.staff_data is None or self.data_handler.staff_data.empty:
@@ -1132,40 +1433,52 @@ Respond with ONLY the JSON object, no additional text."""
                 if request['status'] == 'Approved'
             ] if hasattr(st.session_state, 'leave_requests') else None
             
-            # Generate roster
-            roster_df, success = self.optimizer.optimize_roster(
-                self.data_handler.staff_data,
-                num_days,
-                shifts_per_day,
-                min_staff_per_shift,
-                max_shifts_per_week,
-                self.data_handler.get_staff_preferences(),
-                leave_requests=approved_leaves
-            )
+            # Generate roster, reusing the solution for identical inputs. Staff changes bump
+            # staff_version (preferences derive from staff); leave is placed relative to today
+            roster_key = hashlib.sha256(json.dumps(
+                [settings, self.data_handler.staff_version, approved_leaves, self._today.isoformat()],
+                sort_keys=True, default=str
+            ).encode()).hexdigest()
+            cached_roster = self._roster_cache.get(roster_key)
+            if cached_roster is not None:
+                self._roster_cache.move_to_end(roster_key)
+                roster_df, success = cached_roster.copy(), True
+            else:
+                roster_df, success = self.optimizer.optimize_roster(
+                    self.data_handler.staff_data,
+                    num_days,
+                    shifts_per_day,
+                    min_staff_per_shift,
+                    max_shifts_per_week,
+                    self.data_handler.get_staff_preferences(),
+                    leave_requests=approved_leaves
+                )
+                if success and roster_df is not None and not roster_df.empty:
+                    self._roster_cache[roster_key] = roster_df.copy()
+                    if len(self._roster_cache) > _ROSTER_CACHE_SIZE:
+                        self._roster_cache.popitem(last=False)
             
             if success and roster_df is not None and not roster_df.empty:
-                # Add weekday to the roster DataFrame
-                roster_df['Weekday'] = pd.to_datetime(roster_df['Date']).dt.strftime('%A')
+                # Add weekday to the roster DataFrame (dayofweek is 0 for Monday, matching _WEEKDAY_NAMES)
+                dates = pd.to_datetime(roster_df['Date'], format='%Y-%m-%d')
+                roster_df['Weekday'] = pd.Categorical.from_codes(dates.dt.dayofweek.to_numpy(), categories=_WEEKDAY_NAMES)
                 
-                # Add shift mapping for better display
-                shift_time_map = {
-                    1: "07:00-15:00",
-                    2: "15:00-23:00",
-                    3: "23:00-07:00"
-                }
-                roster_df['Shift Time'] = roster_df['Shift'].map(shift_time_map)
+                # Add shift mapping for better display; shifts without a known time are left empty
+                shift_codes = roster_df['Shift'].to_numpy() - 1
+                shift_codes[(shift_codes < 0) | (shift_codes >= len(_SHIFT_TIMES))] = -1
+                roster_df['Shift Time'] = pd.Categorical.from_codes(shift_codes, categories=_SHIFT_TIMES)
                 
-                # Add staff count column
-                roster_df['Staff_Count'] = roster_df['Staff'].apply(lambda x: len(x.split(',')) if isinstance(x, str) and x.strip() != 'No staff assigned' else 0)
+                # Add staff count column: names are comma-separated, so count the commas in one pass
+                roster_df['Staff_Count'] = count_assigned_staff(roster_df['Staff'])
                 
                 # Calculate metrics
                 metrics = self.optimizer.calculate_roster_metrics(roster_df)
                 
                 # Save roster to database
                 if self.data_handler.db.save_roster(roster_df):
-                    print("Roster saved to database successfully")
+                    logger.debug("Roster saved to database successfully")
                 else:
-                    print("Warning: Failed to save roster to database")
+                    logger.warning("Failed to save roster to database")
                 
                 # Format the roster for display
                 table = self._df_to_markdown_table(roster_df)
@@ -1176,9 +1489,6 @@ Respond with ONLY the JSON object, no additional text."""
                 st.session_state.current_page = "📅 Roster Generation"
                 # Only set trigger_rerun_for_roster here for navigation
                 st.session_state.trigger_rerun_for_roster = True
-                st.session_state.roster_df = roster_df
-                st.session_state.last_update = datetime.now()
-                st.session_state.current_page = "📅 Roster Generation"
                 st.rerun()
                 
                 return (
@@ -1203,9 +1513,9 @@ Respond with ONLY the JSON object, no additional text."""
                 )
                 
         except Exception as e:
-            return f"❌ An unexpected error occurred while generating the roster: {str(e)}. Please try again or contact support if the issue persists."
+            return f"❌ An unexpected error occurred while generating the roster: {e}. Please try again or contact support if the issue persists."
 
-    def _execute_check_leave(self, params: Dict[str, Any]) -> str:
+    def _execute_check_leave(self, params: Dict[str, Any]) -> Union[str, Iterator[str]]:
         """Execute CHECK_LEAVE intent."""
         days = params.get("days", 7)
         staff = params.get("staff", "ALL")
@@ -1213,29 +1523,18 @@ Respond with ONLY the JSON object, no additional text."""
         if days <= 0:
             return "I'm sorry, but the number of days must be positive. Please provide a valid number."
         
-        # Get current date and calculate end date
-        current_date = datetime.now().date()
-        end_date = current_date + timedelta(days=days)
+        # Get current date and calculate the last day of the window
+        current_date = self._today
+        window_end = current_date + timedelta(days=days)
         
-        # Get leave requests
-        leave_requests = self.data_handler.db.get_leave_requests(
+        # Approved leave overlapping the window, selected by an indexed range query
+        upcoming_leaves = self.data_handler.db.get_leave_requests(
             staff_name=staff if staff != "ALL" else None,
             status="Approved",
-            period="Future"
+            date_from=current_date.isoformat(),
+            date_to=window_end.isoformat()
         )
         
-        if not leave_requests:
-            return f"No approved leave requests found for the next {days} days."
-        
-        # Filter leave requests for the specified period
-        upcoming_leaves = []
-        for req in leave_requests:
-            start_date = datetime.strptime(req["start_date"], "%Y-%m-%d").date()
-            end_date_req = datetime.strptime(req["end_date"], "%Y-%m-%d").date()
-            
-            if start_date <= end_date and end_date_req >= current_date:
-                upcoming_leaves.append(req)
-        
         if not upcoming_leaves:
             return f"No approved leave requests found for the next {days} days."
         
@@ -1245,14 +1544,15 @@ Respond with ONLY the JSON object, no additional text."""
             result += f" for {staff}"
         result += ":\n\n"
         
-        for req in upcoming_leaves:
-            result += f"• {req['staff_name']} - {req['leave_type']}\n"
-            result += f"  {req['start_date']} to {req['end_date']} ({req['duration']} days)\n"
-            if req.get('reason'):
-                result += f"  Reason: {req['reason']}\n"
-            result += "\n"
-        
-        return result
+        return self._iter_leave_listing(result, upcoming_leaves, _UPCOMING_LEAVE_ENTRY_TEMPLATE)
+
+    def _iter_leave_listing(self, header: str, leave_requests: List[Dict[str, Any]], template: str) -> Iterator[str]:
+        """Yield a listing header followed by one filled template per leave request."""
+        yield header
+        for req in leave_requests:
+            yield template.format(
+                reason_line=f"  Reason: {reason}\n" if (reason := req.get('reason')) else "", **req
+            )
 
     def _execute_query_roster(self, params: Dict[str, Any]) -> str:
         """Handle queries about the roster for staff, day, or date."""
@@ -1276,17 +1576,21 @@ Respond with ONLY the JSON object, no additional text."""
                 return f"Here are the shifts for {staff_name} in the current roster:\n\n{table}"
             elif role and weekday:
                 # Show all staff of a role working on a given weekday
-                mask = (roster_df['Weekday'].str.lower() == weekday.lower()) & (roster_df['Staff'].str.contains(role, case=False, na=False))
                 day_shifts = roster_df[roster_df['Weekday'].str.lower() == weekday.lower()]
                 if day_shifts.empty:
                     return f"No {role}s found working on {weekday}."
-                result = f"{role}s working on {weekday}:\n"
+                # Loop-invariant pieces are computed once, not per staff entry
+                header = f"{role}s working on {weekday}:"
+                role_lower = role.lower()
+                lines = []
                 for _, row in day_shifts.iterrows():
                     staff_list = row['Staff']
                     for staff in staff_list.split(','):
-                        if role.lower() in staff.lower():
-                            result += f"• {staff.strip()} ({row['Shift Time']})\n"
-                return result if result.strip() != f"{role}s working on {weekday}:" else f"No {role}s found working on {weekday}."
+                        if role_lower in staff.lower():
+                            lines.append(f"• {staff.strip()} ({row['Shift Time']})\n")
+                if not lines:
+                    return f"No {role}s found working on {weekday}."
+                return header + "\n" + "".join(lines)
             elif date:
                 # Show all staff working on a specific date
                 mask = roster_df['Date'] == pd.to_datetime(date)
@@ -1298,70 +1602,65 @@ Respond with ONLY the JSON object, no additional text."""
             else:
                 return "Please specify a staff name, role and weekday, or date for the roster query."
         except Exception as e:
-            return f"I apologize, but I encountered an error while processing your roster query: {str(e)}. Please try again."
+            return f"I apologize, but I encountered an error while processing your roster query: {e}. Please try again."
 
     def _df_to_markdown_table(self, df, max_rows=5):
         if df is None or df.empty:
             return "No roster data available."
-        display_df = df.head(max_rows)
+        # Only the rows shown are converted to strings; columns are then joined whole
+        display_df = df.head(max_rows).astype(str)
         headers = "| " + " | ".join(display_df.columns) + " |\n"
         separators = "|" + "---|" * len(display_df.columns) + "\n"
-        rows = "\n".join(
-            "| " + " | ".join(str(cell) for cell in row) + " |" for row in display_df.values.tolist()
+        cells = display_df.iloc[:, 0].str.cat(
+            [display_df[column] for column in display_df.columns[1:]], sep=" | ", na_rep=""
         )
+        rows = ("| " + cells + " |").str.cat(sep="\n")
         return headers + separators + rows
 
-    def _retrieve_relevant_context(self, user_input: str) -> str:
+    def _retrieve_relevant_context(self, parsed: _ParsedInput) -> str:
         """
         Retrieve relevant information from the database for the user query (RAG layer).
         Args:
-            user_input: The user's input text
+            parsed: The user's input text, parsed once for the turn
         Returns:
             str: Relevant context string
         """
         try:
-            user_input_lower = user_input.lower()
+            topics = _CONTEXT_KEYWORDS.scan(parsed.lower)
             # Staff-related queries
-            if any(word in user_input_lower for word in ["staff", "doctor", "nurse", "specialist", "employee", "team"]):
+            if "staff" in topics:
                 # Check if it's a roster query for a specific staff member
-                if any(word in user_input_lower for word in ["roster", "shift", "schedule"]):
+                if "roster" in topics:
                     # Try to extract staff name
                     staff_name = None
+                    words = parsed.tokens
                     for role in ["doctor", "nurse", "specialist"]:
-                        if role in user_input_lower:
+                        # Only a role standing as a whole word has words around it
+                        if role in parsed.token_set:
                             # Look for words around the role
-                            words = user_input_lower.split()
-                            try:
-                                idx = words.index(role)
-                                if idx > 0:  # Check word before role
-                                    staff_name = words[idx-1].capitalize()
-                                elif idx < len(words)-1:  # Check word after role
-                                    staff_name = words[idx+1].capitalize()
-                            except ValueError:
-                                continue
+                            idx = words.index(role)
+                            if idx > 0:  # Check word before role
+                                staff_name = words[idx-1].capitalize()
+                            elif idx < len(words)-1:  # Check word after role
+                                staff_name = words[idx+1].capitalize()
                     
                     if staff_name:
                         return self._get_staff_roster_response(staff_name)
                 
-                # Always fetch fresh staff data from the database
-                staff_df = self.data_handler.db.get_all_staff()
-                staff_info = "Staff List:\n"
-                for _, staff in staff_df.iterrows():
-                    staff_info += f"- {staff['name']} ({staff['role']}): {staff['skills']}\n"
-                return staff_info
+                return "Staff List:\n" + self._get_staff_lines()
                 
             # Leave-related queries
-            elif any(word in user_input_lower for word in ["leave", "vacation", "absence", "holiday"]):
-                leave_requests = self.data_handler.db.get_all_leave_requests()
+            elif "leave" in topics:
+                leave_requests = self.data_handler.db.get_recent_leave_requests(5)
                 if not leave_requests:
                     return "No leave requests found in the system."
-                leave_info = "Recent Leave Requests:\n"
-                for req in leave_requests[-5:]:  # Show last 5 leave requests
-                    leave_info += f"- {req['staff_member']} | {req['leave_type']} | {req['start_date']} to {req['end_date']} | Status: Approved\n"
-                return leave_info
+                # Show last 5 leave requests
+                return "Recent Leave Requests:\n" + "".join(
+                    _LEAVE_CONTEXT_LINE_TEMPLATE.format_map(req) for req in leave_requests
+                )
                 
             # Roster-related queries
-            elif any(word in user_input_lower for word in ["roster", "shift", "schedule"]):
+            elif "roster" in topics:
                 roster_df = self.data_handler.db.get_roster()
                 if not roster_df.empty:
                     table = self._df_to_markdown_table(roster_df)
@@ -1371,16 +1670,16 @@ Respond with ONLY the JSON object, no additional text."""
                     
             # General queries
             else:
-                staff_df = self.data_handler.db.get_all_staff()
-                leave_requests = self.data_handler.db.get_all_leave_requests()
+                staff_df = self._get_staff_df()
+                leave_count = self._turn_read("leave_count", self.data_handler.db.count_leave_requests)
                 
-                if len(leave_requests) == 0:
+                if leave_count == 0:
                     context = f"There are {len(staff_df)} staff members and currently no leave requests in the system."
                 else:
-                    context = f"There are {len(staff_df)} staff members and {len(leave_requests)} leave requests in the system."
+                    context = f"There are {len(staff_df)} staff members and {leave_count} leave requests in the system."
                 return context
         except Exception as e:
-            return f"Error retrieving context: {str(e)}"
+            return f"Error retrieving context: {e}"
 
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the chatbot."""
@@ -1397,79 +1696,182 @@ Respond with ONLY the JSON object, no additional text."""
             "Remember: Always respond in English, even if the user writes in another language."
         )
 
-    def _get_context(self) -> str:
-        """Get current context about staff and leave data."""
-        try:
-            # Always fetch fresh staff data from the database
-            staff_df = self.data_handler.db.get_all_staff()
-            staff_info = "Current Staff:\n"
-            for _, staff in staff_df.iterrows():
-                staff_info += f"- {staff['name']} ({staff['role']}): {staff['skills']}\n"
-            return staff_info
-        except Exception as e:
-            return f"Error getting context: {str(e)}"
+    def _get_staff_lines(self) -> str:
+        """
+        Render one "- name (role): skills" line per staff member from the shared staff frame
+        (_get_staff_df), cached until that frame is replaced, so the LLM context and the keyword
+        rules see the same rows. Lines are sorted by name and skills alphabetically, so the text
+        only changes with the data.
+        """
+        source = self._get_staff_df()
+        if self._staff_context_cache[0] is not source:
+            staff_df = source.sort_values('name', kind='stable')
+            lines = "".join(
+                f"- {name} ({role}): {', '.join(sorted(s.strip() for s in str(skills).split(',') if s.strip()))}\n"
+                for name, role, skills in zip(
+                    staff_df['name'].to_numpy(), staff_df['role'].to_numpy(), staff_df['skills'].to_numpy()
+                )
+            )
+            self._staff_context_cache = (source, lines)
+        return self._staff_context_cache[1]
 
-    def _call_groq(self, messages: List[Dict[str, str]]) -> str:
-        """Make API call to Groq with retry mechanism for rate limiting."""
-        print(f"Debug - Making API call with key: {self.api_key[:10]}...")  # Only print first 10 chars for security
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
-        
+    def _call_groq(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                   stop_when: Optional[Callable[[str], bool]] = None) -> str:
+        """Make API call to Groq with retry mechanism for rate limiting.
+        Deterministic (temperature 0) calls are answered from the response cache when possible.
+        With stop_when, the completion is streamed and the connection is closed as soon as
+        stop_when(text_so_far) is true, so the model stops generating tokens nobody reads.
+        """
         data = {
             "model": "llama-3.1-8b-instant",  # Using Llama 3.1 8B instant model on Groq
             "messages": messages,
-            "temperature": 0.7,
+            "temperature": temperature,
             "max_tokens": 1000
         }
         
+        cache_key = None
+        if temperature == 0:
+            cache_key = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                return cached
+        
+        logger.debug("Making API call with key: %s...", self.api_key[:10])  # Only log first 10 chars for security
+        
+        if stop_when is not None:
+            content = ""
+            stream = self._stream_groq(messages, temperature)
+            try:
+                for chunk in stream:
+                    content += chunk
+                    if stop_when(content):
+                        break
+            finally:
+                stream.close()  # Hangs up on the server mid-generation when we stopped early
+            if cache_key is not None and not content.startswith("API_"):
+                self._store_cached_response(cache_key, content)
+            return content
+        
         # Retry mechanism for rate limiting
         max_retries = 3
         retry_delay = 2  # seconds
         
         for attempt in range(max_retries):
             try:
-                response = requests.post(self.api_url, headers=headers, json=data)
+                self._throttle()
+                response = self._session.post(self.api_url, json=data, timeout=_API_TIMEOUT)
                 
                 # Handle rate limiting and other errors
                 if response.status_code == 429:
                     if attempt < max_retries - 1:
-                        print(f"Rate limit hit, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                        import time
+                        logger.warning("Rate limit hit, retrying in %s seconds... (attempt %d/%d)", retry_delay, attempt + 1, max_retries)
                         time.sleep(retry_delay)
                         retry_delay *= 2  # Exponential backoff
                         continue
                     else:
                         return "API_RATE_LIMIT_ERROR: Too many requests. Please wait a moment and try again."
-                elif response.status_code == 401:
-                    return "API_AUTH_ERROR: Invalid API key. Please check your OpenRouter API key."
-                elif response.status_code == 403:
-                    return "API_FORBIDDEN_ERROR: Access denied. Please check your API key permissions."
+                elif response.status_code in _API_STATUS_ERRORS:
+                    return _API_STATUS_ERRORS[response.status_code]
                 elif response.status_code >= 400:
                     return f"API_ERROR_{response.status_code}: {response.text}"
                 
                 response.raise_for_status()
-                return response.json()['choices'][0]['message']['content']
+                content = response.json()['choices'][0]['message']['content']
+                if cache_key is not None:
+                    self._store_cached_response(cache_key, content)
+                return content
                 
             except requests.exceptions.RequestException as e:
                 if attempt < max_retries - 1:
-                    print(f"Request failed, retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                    import time
+                    logger.warning("Request failed, retrying in %s seconds... (attempt %d/%d)", retry_delay, attempt + 1, max_retries)
                     time.sleep(retry_delay)
                     retry_delay *= 2
                     continue
                 else:
-                    return f"API_REQUEST_ERROR: {str(e)}"
+                    return f"API_REQUEST_ERROR: {e}"
             except Exception as e:
-                return f"API_ERROR: {str(e)}"
+                return f"API_ERROR: {e}"
         
         return "API_ERROR: Max retries exceeded"
 
+    def _throttle(self):
+        """Wait for a slot in the outbound rate limit before sending a request."""
+        wait = self._rate_limiter.take()
+        if wait > 0:
+            logger.debug("Rate limiter delaying request by %.2f seconds", wait)
+            time.sleep(wait)
+
+    def _get_cached_response(self, cache_key: str):
+        """Return a fresh cached completion for cache_key, or None on a miss."""
+        entry = self._response_cache.get(cache_key)
+        if entry is not None and time.time() - entry[0] <= _RESPONSE_CACHE_TTL:
+            self._response_cache.move_to_end(cache_key)
+            self.cache_stats["hits"] += 1
+            return entry[1]
+        if entry is not None:
+            del self._response_cache[cache_key]
+        self.cache_stats["misses"] += 1
+        return None
+
+    def _store_cached_response(self, cache_key: str, content: str):
+        """Cache a completion, evicting the least recently used entry when full."""
+        self._response_cache[cache_key] = (time.time(), content)
+        self._response_cache.move_to_end(cache_key)
+        if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    def _stream_groq(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> Iterator[str]:
+        """Make a streaming API call to Groq, yielding content deltas as they arrive."""
+        data = {
+            "model": "llama-3.1-8b-instant",
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": 1000,
+            "stream": True
+        }
+        
+        try:
+            self._throttle()
+            with self._session.post(self.api_url, json=data, timeout=_API_TIMEOUT, stream=True) as response:
+                if response.status_code == 429:
+                    # Let the blocking call handle rate-limit backoff
+                    yield self._call_groq(messages, temperature)
+                    return
+                elif response.status_code in _API_STATUS_ERRORS:
+                    yield _API_STATUS_ERRORS[response.status_code]
+                    return
+                elif response.status_code >= 400:
+                    yield f"API_ERROR_{response.status_code}: {response.text}"
+                    return
+                
+                # Server-sent events: one "data: {...}" line per chunk, terminated by "data: [DONE]"
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data: "):
+                        continue
+                    payload = line[len("data: "):]
+                    if payload == "[DONE]":
+                        break
+                    try:
+                        content = json.loads(payload)['choices'][0]['delta'].get('content')
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                        # A malformed chunk is skipped rather than ending the reply mid-stream
+                        continue
+                    if content:
+                        yield content
+        except requests.exceptions.RequestException as e:
+            yield f"API_REQUEST_ERROR: {e}"
+
     def refresh_data_handler(self):
-        """Refresh the data handler reference to get updated staff data."""
-        if hasattr(self, 'data_handler') and self.data_handler:
-            self.data_handler.staff_data = self.data_handler.db.get_all_staff()
+        """
+        Pick up staff changes made outside the chatbot. The data handler is shared with the
+        app, so its refreshed staff_data is already visible; only derived caches need dropping.
+        """
+        self._invalidate_context_cache()
+
+    def _invalidate_context_cache(self):
+        """Forget the rendered staff context and cached staff rows so the next turn rebuilds them."""
+        self._staff_context_cache = (None, None)
+        self._staff_df_cache = (0.0, None, None)
 
     def _get_staff_roster_response(self, staff_name=None, date=None) -> str:
         """Get roster information for a specific staff member."""
@@ -1484,36 +1886,62 @@ Respond with ONLY the JSON object, no additional text."""
                 else:
                     return "No roster entries found."
             
-            response = ""
             if staff_name:
-                response = f"📅 Roster for {staff_name}:\n\n"
+                parts = [f"📅 Roster for {staff_name}:\n\n"]
             else:
-                response = "📅 Current Roster:\n\n"
+                parts = ["📅 Current Roster:\n\n"]
             
             # Group entries by date
             current_date = None
             for entry in roster_entries:
                 if current_date != entry['Date']:
                     current_date = entry['Date']
-                    response += f"\n**{entry['Weekday']}, {entry['Date']}**\n"
-                response += f"• {entry['Shift Time']}: {entry['Staff']}\n"
+                    parts.append(f"\n**{entry['Weekday']}, {entry['Date']}**\n")
+                parts.append(f"• {entry['Shift Time']}: {entry['Staff']}\n")
             
-            return response
+            return "".join(parts)
             
         except Exception as e:
-            return f"I'm sorry, but I encountered an error while retrieving the roster: {str(e)}. Please try again."
+            return f"I'm sorry, but I encountered an error while retrieving the roster: {e}. Please try again."
 
     def _clean_response(self, response: str) -> str:
         """
         Clean response from HTML tags and ensure proper formatting.
         This method ensures no HTML tags are left in the final response.
         """
-        import re
-        # First pass: remove all HTML tags
-        cleaned = re.sub(r'<[^>]+>', '', response).strip()
-        # Second pass: fix any HTML entities
-        cleaned = cleaned.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
-        return cleaned
+        return self._strip_markup(response).strip()
+
+    def _clean_result(self, result: Union[str, Iterator[str]]) -> Union[str, Iterator[str]]:
+        """Clean a handler result, keeping streamed listings lazy."""
+        if isinstance(result, str):
+            return self._clean_response(result)
+        return self._clean_chunks(result)
+
+    def _clean_chunks(self, chunks: Iterator[str]) -> Iterator[str]:
+        """
+        Clean streamed text as it arrives; whitespace is kept so chunks still join up correctly.
+        A tag or entity split across chunks is held back until its closing character arrives.
+        """
+        pending = ""
+        for chunk in chunks:
+            pending += chunk
+            cut = len(pending)
+            tag_start = pending.rfind('<')
+            if tag_start != -1 and '>' not in pending[tag_start:] and cut - tag_start < _MAX_HELD_TAG:
+                cut = tag_start
+            entity_start = pending.rfind('&', 0, cut)
+            if entity_start != -1 and ';' not in pending[entity_start:cut] and cut - entity_start < _MAX_HELD_ENTITY:
+                cut = entity_start
+            ready, pending = pending[:cut], pending[cut:]
+            if ready:
+                yield self._strip_markup(ready)
+        if pending:
+            yield self._strip_markup(pending)
+
+    def _strip_markup(self, text: str) -> str:
+        """Remove HTML tags and decode the escaped angle brackets and ampersands."""
+        cleaned = _HTML_TAG_RE.sub('', text)
+        return cleaned.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
 
     def _execute_delete_leave(self, params: Dict[str, Any]) -> str:
         """Execute DELETE_LEAVE intent."""
@@ -1528,12 +1956,10 @@ Respond with ONLY the JSON object, no additional text."""
             else:
                 return f"Could not find or delete leave request {request_id}. Please check the ID and try again."
         # If staff_member and date are provided, try to find the leave request
-        leave_requests = self.data_handler.db.get_all_leave_requests()
-        filtered = leave_requests
+        # The database narrows to requests covering the date; names are compared case-insensitively here
+        filtered = self.data_handler.db.get_leave_requests(date_from=date, date_to=date)
         if staff_member:
             filtered = [r for r in filtered if r['staff_member'].lower() == staff_member.lower()]
-        if date:
-            filtered = [r for r in filtered if r['start_date'] <= date <= r['end_date']]
         if len(filtered) == 1:
             req_id = filtered[0]['id']
             success = self.data_handler.db.delete_leave_request(req_id)
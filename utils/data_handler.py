@@ -5,9 +5,21 @@ import json
 from datetime import datetime, timedelta
 from utils.database import DatabaseHandler
 
+
+def count_assigned_staff(staff: pd.Series) -> pd.Series:
+    """
+    Number of names in each comma-separated roster Staff value. Non-string values and the
+    'No staff assigned' placeholder count as 0; any other string, even an empty one, as commas + 1.
+    """
+    counts = staff.str.count(',') + 1
+    assigned = counts.notna() & (staff.str.strip() != 'No staff assigned')
+    return counts.where(assigned, 0).astype(int)
+
+
 class DataHandler:
     def __init__(self):
         print("Initializing DataHandler...")
+        self.staff_version = 0
         self.db = DatabaseHandler()
         print("DatabaseHandler created, initializing database...")
         self.db.initialize_database()  # Explicitly call initialize_database
@@ -28,8 +40,21 @@ class DataHandler:
                 raise ValueError(f"Failed to initialize staff data with required columns: {required_columns}")
         
         self.shift_patterns = None
+        self._staff_by_name = {}
+        self._staff_by_name_source = None
         print("DataHandler initialization completed.")
         
+    @property
+    def staff_data(self):
+        """Current staff DataFrame."""
+        return self._staff_data
+
+    @staff_data.setter
+    def staff_data(self, value):
+        # Every reassignment bumps the version so derived caches know to rebuild
+        self._staff_data = value
+        self.staff_version += 1
+
     def load_staff_data(self, file=None):
         """Load staff data from Excel file and store in database."""
         try:
@@ -85,6 +110,18 @@ class DataHandler:
             return True
         return False
 
+    def get_staff_by_name(self) -> Dict[str, tuple]:
+        """Map each unique staff name to its (id, role), rebuilt only when staff_data has been replaced."""
+        if self._staff_by_name_source is not self.staff_data:
+            # Shared names are left out so callers fall back to asking which one is meant
+            unique = self.staff_data[~self.staff_data['name'].duplicated(keep=False)]
+            self._staff_by_name = {
+                name: (int(staff_id), role)
+                for name, staff_id, role in zip(unique['name'], unique['id'], unique['role'])
+            }
+            self._staff_by_name_source = self.staff_data
+        return self._staff_by_name
+
     def save_staff_data(self, file_path: str) -> None:
         """Save staff data to Excel file."""
         if self.staff_data is not None:
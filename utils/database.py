@@ -1,17 +1,43 @@
+import atexit
 import sqlite3
 import pandas as pd
 from datetime import datetime
 import json
 
+# Database files whose PRAGMA optimize is already scheduled for interpreter exit
+_OPTIMIZE_AT_EXIT = set()
+
+
+def _optimize_database(db_path):
+    """Run PRAGMA optimize so SQLite can refresh statistics gathered by earlier queries."""
+    conn = None
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA optimize")
+    except Exception as e:
+        print(f"Error optimizing database: {str(e)}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
 class DatabaseHandler:
     def __init__(self, db_path='data/roster.db'):
         self.db_path = db_path
         self.initialize_database()
+        # One exit hook per database file; it holds only the path, so handlers are not kept alive
+        if db_path not in _OPTIMIZE_AT_EXIT:
+            _OPTIMIZE_AT_EXIT.add(db_path)
+            atexit.register(_optimize_database, db_path)
 
     def get_connection(self):
         """Create a database connection."""
         return sqlite3.connect(self.db_path)
 
+    def optimize(self):
+        """Run PRAGMA optimize on this handler's database now."""
+        _optimize_database(self.db_path)
+
     def initialize_database(self):
         """Initialize database with required tables."""
         try:
@@ -48,6 +74,17 @@ class DatabaseHandler:
                 )
             ''')
 
+            # Index date-window lookups (approved leave overlapping a range of days)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leave_dates
+                ON leave_requests(status, start_date, end_date)
+            ''')
+            # Single-staff lookups get their own index so they never scan everyone's leave
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_leave_staff
+                ON leave_requests(staff_member, status, start_date)
+            ''')
+
             # Create roster table if it doesn't exist
             print("Creating roster table if not exists...")
             cursor.execute('''
@@ -301,6 +338,39 @@ class DatabaseHandler:
         finally:
             conn.close()
 
+    def count_leave_requests(self):
+        """Count leave requests without fetching them."""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM leave_requests')
+            return cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error counting leave requests: {str(e)}")
+            return 0
+        finally:
+            conn.close()
+
+    def get_recent_leave_requests(self, limit=5):
+        """Get the most recently added leave requests, oldest first."""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, staff_member, leave_type, start_date, end_date, 
+                       duration, reason, status, submitted_date
+                FROM leave_requests
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (limit,))
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in reversed(cursor.fetchall())]
+        except Exception as e:
+            print(f"Error getting recent leave requests: {str(e)}")
+            return []
+        finally:
+            conn.close()
+
     def get_approved_leave_requests(self):
         """Get all approved leave requests as a list of dictionaries."""
         try:
@@ -341,8 +411,11 @@ class DatabaseHandler:
             if 'conn' in locals():
                 conn.close()
 
-    def get_leave_requests(self, staff_name=None, status=None, period=None):
-        """Get leave requests with optional filtering."""
+    def get_leave_requests(self, staff_name=None, status=None, period=None, date_from=None, date_to=None):
+        """
+        Get leave requests with optional filtering.
+        date_from/date_to (YYYY-MM-DD) keep only requests overlapping that window of days.
+        """
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -380,6 +453,14 @@ class DatabaseHandler:
                     query += " AND start_date > ?"
                     params.append(current_date.isoformat())
             
+            # Filter by overlap with a date window
+            if date_to:
+                query += " AND start_date <= ?"
+                params.append(date_to)
+            if date_from:
+                query += " AND end_date >= ?"
+                params.append(date_from)
+            
             cursor.execute(query, params)
             
             columns = [col[0] for col in cursor.description]
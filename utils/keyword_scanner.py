@@ -0,0 +1,33 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable
+
+
+class KeywordScanner:
+    """Find which keyword categories occur in a text with one left-to-right regex pass."""
+
+    def __init__(self, categories: Dict[str, Iterable[str]], cache_size: int = 256):
+        categories = {category: tuple(keywords) for category, keywords in categories.items()}
+        keywords = {keyword for words in categories.values() for keyword in words}
+        # The scan reports only the longest keyword starting at a position, so each keyword
+        # also carries the categories of the keywords that are its prefixes
+        self._categories_of: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(
+                category for category, words in categories.items()
+                if any(keyword.startswith(word) for word in words)
+            )
+            for keyword in keywords
+        }
+        # Zero-width lookahead so overlapping keywords are all seen
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)) + "))"
+        )
+        # Users repeat the same short commands, so recent results are kept per scanner
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _scan(self, text: str) -> FrozenSet[str]:
+        """Return the categories with at least one keyword occurring as a substring of text."""
+        found = set()
+        for match in self._pattern.finditer(text):
+            found |= self._categories_of[match.group(1)]
+        return frozenset(found)
@@ -104,20 +104,37 @@ class RosterOptimizer:
 
             # Create shift variables with leave constraints
             shifts = {}
+            # Leave requests often share dates, so convert each distinct string to a day ordinal once
+            day_ordinals = {}
+
+            def day_ordinal(value):
+                ordinal = day_ordinals.get(value)
+                if ordinal is None:
+                    ordinal = day_ordinals[value] = datetime.fromisoformat(value).toordinal()
+                return ordinal
+
+            # Staff-by-day leave matrix: leave periods become parallel arrays of day offsets from
+            # today, and one broadcast comparison marks every (leave, day) overlap
+            today_ordinal = datetime.now().toordinal()
+            rows_by_name = {}
+            for row, name in enumerate(staff_data['name']):
+                rows_by_name.setdefault(name, []).append(row)
+            leave_rows, leave_starts, leave_ends = [], [], []
+            for request in leave_requests or []:
+                for row in rows_by_name.get(request['staff_member'], ()):
+                    leave_rows.append(row)
+                    leave_starts.append(day_ordinal(request['start_date']) - today_ordinal)
+                    leave_ends.append(day_ordinal(request['end_date']) - today_ordinal)
+            on_leave = np.zeros((num_staff, num_days), dtype=bool)
+            if leave_rows:
+                days = np.arange(num_days)
+                overlaps = (days >= np.array(leave_starts)[:, None]) & (days <= np.array(leave_ends)[:, None])
+                np.logical_or.at(on_leave, np.array(leave_rows), overlaps)
+
             for staff in range(num_staff):
                 for day in range(num_days):
                     # Check if staff is on leave
-                    is_on_leave = False
-                    if leave_requests:
-                        staff_name = staff_data.iloc[staff]['name']
-                        for request in leave_requests:
-                            if request['staff_member'] == staff_name:
-                                start_date = datetime.strptime(request['start_date'], '%Y-%m-%d')
-                                end_date = datetime.strptime(request['end_date'], '%Y-%m-%d')
-                                current_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=day)
-                                if start_date <= current_date <= end_date:
-                                    is_on_leave = True
-                                    break
+                    is_on_leave = on_leave[staff, day]
                     
                     for shift in range(shifts_per_day):
                         shifts[(staff, day, shift)] = self.model.NewBoolVar(
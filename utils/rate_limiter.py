@@ -0,0 +1,23 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Client-side rate limiter: `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Reserve one request slot and return how many seconds to wait before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            # A negative balance is the backlog of reserved slots still being refilled
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
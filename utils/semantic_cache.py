@@ -0,0 +1,92 @@
+import re
+import zlib
+from typing import Optional
+
+import numpy as np
+
+# Filler words that do not change what the user is asking for
+STOPWORDS = frozenset({
+    "a", "an", "the", "as", "please", "can", "could", "would", "you", "me", "i",
+    "to", "is", "are", "be", "kindly", "just", "now", "hey",
+})
+
+
+def content_tokens(text: str) -> frozenset:
+    """The distinct words of text that carry meaning, i.e. everything but the stopwords."""
+    return frozenset(token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS)
+
+
+class SemanticCache:
+    """
+    Cache LLM responses for rephrased prompts using cosine similarity of cheap text embeddings.
+    A hit also needs exactly the same content words, so a prompt that differs by a name, date
+    or number never gets another prompt's response; only filler words and word order may differ.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024, dim: int = 384):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self._emb_matrix = np.zeros((max_entries, dim), dtype=np.float32)
+        self._context_keys = [None] * max_entries
+        self._token_keys = [None] * max_entries
+        self._cached_responses = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text as an L2-normalised hashed bag of words."""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            if token not in STOPWORDS:
+                vector[zlib.crc32(token.encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, text: str, context_key: str) -> Optional[str]:
+        """Return the response cached for a rephrasing of the prompt made in the same context, or None."""
+        if self._size == 0:
+            return None
+        query = self.embed(text)
+        if not query.any():
+            return None
+        tokens = content_tokens(text)
+        # Rows and query are unit vectors, so the dot product is the cosine similarity
+        sims = self._emb_matrix[:self._size] @ query
+        # Only entries cached in the same context with the same content words are candidates
+        candidates = np.fromiter(
+            (key == context_key and token_key == tokens
+             for key, token_key in zip(self._context_keys[:self._size], self._token_keys[:self._size])),
+            dtype=bool, count=self._size,
+        )
+        sims[~candidates] = -1.0
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        self._clock += 1
+        self._last_used[best] = self._clock
+        return self._cached_responses[best]
+
+    def add(self, text: str, context_key: str, response: str):
+        """Store a response, replacing the least recently used entry once the cache is full."""
+        embedding = self.embed(text)
+        if not embedding.any():
+            return
+        if self._size < self.max_entries:
+            row = self._size
+            self._size += 1
+        else:
+            row = int(np.argmin(self._last_used))
+        self._clock += 1
+        self._emb_matrix[row] = embedding
+        self._context_keys[row] = context_key
+        self._token_keys[row] = content_tokens(text)
+        self._cached_responses[row] = response
+        self._last_used[row] = self._clock
+
+    def clear(self):
+        """Drop every cached entry."""
+        self._size = 0
+        self._clock = 0
+        self._last_used[:] = 0